@@ -24,7 +24,13 @@ REGISTERED_FONTS = {}
 from .helpers import (
     get_string_metrics,
     get_string_asc_des,
+    get_string_widths,
     get_image_metrics,
+    get_image_info,
+    get_image_pixels,
+    get_resampled_image,
+    clear_image_cache,
+    get_file_mtime,
     does_string_fit,
     scale_string_to_fit,
     trim_string_to_fit,
@@ -33,11 +39,20 @@ from .helpers import (
     rl_colour,
     rl_colour_trans,
     rl_colour_hex,
+    rl_colour_code,
+    rl_fill_tiling_pattern,
     rl_set_border_stroke,
     rl_draw_rect,
     clamp_cmyk,
     canvas_save_state,
     canvas_restore_state,
+    is_dry_run,
+    set_canvas_viewport,
+    get_canvas_viewport,
+    get_culled_count,
+    is_culled,
+    set_canvas_image_dpi,
+    get_canvas_image_dpi,
     MM2PTS,
     IN2PTS,
     PTS2IN,
@@ -46,10 +61,14 @@ from .helpers import (
     PTS2PIX,
     get_edge_colours,
     is_rect_in_transparent_region,
+    clear_alpha_table_cache,
     modify_pdf_file,
     convert_pdf_to_thumbnail,
     convert_pdf_to_png,
+    simplify_polyline,
 )
+from .layoutstate import LayoutStateMixin
+from .staticform import static_content
 from .fonthelpers import (
     register_font_family,
     register_font,
@@ -76,12 +95,23 @@ from .contentrect.svgrect import SvgRect
 from .contentrect.qrcoderect import QRCodeRect
 from .contentrect.alignmentrect import AlignmentRect
 from .tablecell.tablecell import TableCell
+from .tablecell.cellindex import CellIndex
+from .tablecell.rectarray import RectArray
 from .tablecell.tablevector import TableVector
 from .tablecell.tablegrid import TableGrid
 from .tablecell.layoutcell import LayoutCell
 from .tablecell.tablerow import TableRow
 from .tablecell.tablecolumn import TableColumn
+from .tablecell.texttable import TextTable
+from .tablecell.layoutsnapshot import (
+    layout_fingerprint,
+    save_layout_snapshot,
+    load_layout_snapshot,
+)
 from .document.document import Document
+from .document.docflow import DocumentFlow
+from .document.nullcanvas import NullCanvas, layout_report
+from .document.statecanvas import StateCanvas
 from .document.doccallbacks import *
 from .labeldoc.labeldoc import LabelDoc
 from .labeldoc.genericlabel import GenericLabel
@@ -92,6 +122,7 @@ from .labeldoc.simplelabel import SimpleLabel, PlainTextLabel
 from .graphics.arrowhead import ArrowHead
 from .graphics.cmykgrid import CMYKGrid
 from .graphics.line import StyledLine
+from .layoutprofiler import LayoutProfiler, ProfileNode
 
 _font_dict = {
     "DroidSans": "DroidSans.ttf",
@@ -53,6 +53,7 @@ class AlignmentRect(ContentRect):
         s.append("  Content: %r" % (self.content))
         return "\n".join(s)
 
+    @static_content
     def draw_in_canvas(self, c):
         self.draw_rect(c)
         self.draw_content_rect(c)
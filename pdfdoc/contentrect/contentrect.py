@@ -26,8 +26,14 @@
 from toolbox import *
 from pdfdoc import *
 
+# hit/miss counters of memoized content sizes keyed by class name
+_content_size_stats = {}
+
+
+class ContentRect(LayoutStateMixin, DocStyleMixin, RectMixin):
+    # global switch for memoizing get_content_size results of subclasses
+    memoize_content_size = True
 
-class ContentRect(DocStyleMixin, RectMixin):
     def __init__(self, w=None, h=None, style=None, **kwargs):
         w = w if w is not None and not isinstance(w, str) else 1
         h = h if h is not None and not isinstance(w, str) else 1
@@ -45,8 +51,10 @@ class ContentRect(DocStyleMixin, RectMixin):
         self.max_rect = Rect(0, 0)
         # stores a nominal (un-rotated) version of rect
         self._unrotated_rect = None
-        # temporary storage for keeping a copy of rect
-        self.rect_snapshot = Rect(w, h)
+        # temporary storage for keeping a copy of rect while drawing rotated
+        self.rect_snapshot = None
+        # static content is drawn once per document as a re-usable form
+        self.is_static = False
         self.parse_kwargs(**kwargs)
 
     def __repr__(self):
@@ -132,6 +140,7 @@ class ContentRect(DocStyleMixin, RectMixin):
             self.overlay_content.rect = self.rect
             self.overlay_content.draw_in_canvas(c)
 
+    @static_content
     def draw_in_canvas(self, c):
         self.snapshot_rect()
         self.draw_rect(c)
@@ -168,8 +177,54 @@ class ContentRect(DocStyleMixin, RectMixin):
             self._unrotated_rect = Rect(w, h)
             bb = Rect(w, h)
             w, h = bb.rotated_boundbox(self.rotation).size
+        self.mark_clean()
         return w, h
 
+    def content_size_key(self, with_padding, *inputs):
+        """Returns a key describing all of the inputs which determine the size
+        reported by get_content_size.  Subclasses pass their own content
+        specific inputs, e.g. text, filename or available width."""
+        return (
+            inputs,
+            with_padding,
+            id(self.style),
+            self.style.version,
+            self.is_fixed_width,
+            self.is_fixed_height,
+            (self.fixed_rect.width, self.fixed_rect.height),
+            (self.max_rect.width, self.max_rect.height),
+        )
+
+    def memoized_size(self, key):
+        """Returns a previously memoized content size for key or None."""
+        if not ContentRect.memoize_content_size:
+            return None
+        stats = _content_size_stats.setdefault(
+            self.__class__.__name__, {"hits": 0, "misses": 0}
+        )
+        memo = self.__dict__.get("_size_memo", None)
+        if memo is not None and memo[0] == key:
+            stats["hits"] += 1
+            self.mark_clean()
+            return memo[1]
+        stats["misses"] += 1
+        return None
+
+    def memoize_size(self, key, value):
+        if ContentRect.memoize_content_size:
+            self.__dict__["_size_memo"] = (key, value)
+        return value
+
+    @staticmethod
+    def content_size_stats():
+        """Returns a dictionary of content size memoization hits and misses
+        for each ContentRect class."""
+        return {k: dict(v) for k, v in _content_size_stats.items()}
+
+    @staticmethod
+    def reset_content_size_stats():
+        _content_size_stats.clear()
+
     def draw_rect(self, c):
         rl_draw_rect(c, self.rect, self.style)
 
@@ -23,8 +23,11 @@
 #
 # ImageRect image cell container class derived from ContentRect
 
+import math
+
 from toolbox import *
 from pdfdoc import *
+from pdfdoc.helpers import find_preset_file, get_preset_files
 
 
 class ImageRect(ContentRect):
@@ -48,6 +51,8 @@ class ImageRect(ContentRect):
             self.filename = filename
         self.auto_size = auto_size if auto_size is not None else True
         self.dpi = dpi if dpi is not None else 300
+        # resolution at which the image is embedded, None uses the canvas default
+        self.embed_dpi = None
         self.parse_kwargs(**kwargs)
 
     def __repr__(self):
@@ -73,6 +78,7 @@ class ImageRect(ContentRect):
         w, h = self.image_shape
         return w / h
 
+    @static_content
     def draw_in_canvas(self, c):
         self.snapshot_rect()
         self.draw_rect(c)
@@ -88,10 +94,20 @@ class ImageRect(ContentRect):
             return 0, 0
         if self.filename == "":
             return 0, 0
+        key = self.content_size_key(
+            with_padding, self.filename, get_file_mtime(self.filename), self.dpi
+        )
+        size = self.memoized_size(key)
+        if size is not None:
+            return size
         tw, th = PIX2PTS(get_image_metrics(self.filename), self.dpi)
-        return super().get_content_size(tw, th, with_padding=with_padding)
+        size = super().get_content_size(tw, th, with_padding=with_padding)
+        return self.memoize_size(key, size)
 
     def draw_image_rect(self, c):
+        # a dry-run only needs layout, not the decoded graphics
+        if is_dry_run(c):
+            return
         if self.filename is None:
             return
         if self.filename == "":
@@ -108,10 +124,25 @@ class ImageRect(ContentRect):
         c.setFillColor(rl_colour((0, 0, 0)))
         tx, ty = self.aligned_corner(tw, th)
         tx, ty = self.rotated_origin(c, tx, ty)
-        c.drawImage(self.filename, tx, ty, tw, th, mask="auto")
+        image = self.embedded_image(c, iw, ih, tw, th)
+        c.drawImage(image, tx, ty, tw, th, mask="auto")
         if self.style["rotation"]:
             c.restoreState()
 
+    def embedded_image(self, c, iw, ih, tw, th):
+        """Returns the image to embed for a placed size of tw x th points.  If
+        an embedding resolution is set (by embed_dpi or the canvas default) and
+        the image has more pixels than needed, a downsampled copy is returned,
+        otherwise the image filename."""
+        dpi = self.embed_dpi if self.embed_dpi is not None else get_canvas_image_dpi(c)
+        if dpi is None:
+            return self.filename
+        pw = max(1, int(math.ceil(tw * dpi / 72)))
+        ph = max(1, int(math.ceil(th * dpi / 72)))
+        if pw >= iw and ph >= ih:
+            return self.filename
+        return get_resampled_image(self.filename, (min(pw, iw), min(ph, ih)))
+
     def convert_rect_to_pix(self, rect):
         """Converts a passed rect into the pixel coordinates of this image."""
         pl = clamp_value(rect.left, self.rect.left, self.rect.right)
@@ -129,26 +160,14 @@ class ImageRect(ContentRect):
     def from_preset(name, **kwargs):
         """Returns an instance of ImageRect from a named preset graphic included
         in this package."""
-        if not name.endswith(".png"):
-            name = name + ".png"
-        presets = ImageRect.list_presets()
-        for preset in presets:
-            _, pf = split_path(preset)
-            if pf == name:
-                return ImageRect(filename=preset, **kwargs)
+        preset = find_preset_file(name, ".png")
+        if preset is not None:
+            return ImageRect(filename=preset, **kwargs)
         raise ValueError("Cannot find preset PNG image named %s" % (name))
 
     @staticmethod
     def list_presets(as_files=True):
-        fp, _ = split_path(__file__)
-        fp = fp + os.sep + ".." + os.sep + "graphics"
-        fp = os.path.abspath(fp)
-        fs = FileOps()
-        files = fs.get_file_list(fp, "*.png", recursive=True)
-        presets = []
-        for file in files:
-            if str(file).lower().endswith(".png"):
-                presets.append(str(file))
+        presets = get_preset_files(".png")
         if as_files:
-            return sorted(presets)
+            return presets
         return sorted([os.path.basename(f).replace(".png", "") for f in presets])
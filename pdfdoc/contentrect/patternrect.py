@@ -25,9 +25,16 @@
 
 import math
 
+from reportlab.lib.rl_accel import fp_str
+from reportlab.pdfgen.pathobject import PDFPathObject
+
 from toolbox import *
 from pdfdoc import *
 
+# tiled pattern cells keep strokes within this multiple of the line width
+# beyond the cell, i.e. half of the default PDF miter limit of 10
+TILE_MITER_BLEED = 5
+
 
 class PatternRect(ContentRect):
     def __init__(self, w=1, h=1, pattern=None, style=None, **kwargs):
@@ -40,6 +47,7 @@ class PatternRect(ContentRect):
         self.background_colour = (1, 1, 1)
         self.foreground_colour = (1, 0, 0)
         self.inverted = False
+        self.tiled = False
         self.parse_kwargs(**kwargs)
 
     def __repr__(self):
@@ -56,6 +64,7 @@ class PatternRect(ContentRect):
         s.append("  pattern: %s" % (self.pattern))
         return "\n".join(s)
 
+    @static_content
     def draw_in_canvas(self, c):
         self.draw_rect(c)
         self.draw_pattern_rect(c)
@@ -64,42 +73,31 @@ class PatternRect(ContentRect):
             self.draw_debug_rect(c, self.rect)
             self.draw_debug_rect(c, self.inset_rect, DEBUG_INSET_COLOUR)
 
-    def _draw_slant_line(self, c, fc):
+    def _slant_line_metrics(self):
         mrect = self.margin_rect
-        x0, x1 = mrect.left, mrect.right
-        y0, y1 = mrect.bottom, mrect.top
-        xl = x1 - x0
-        yl = y1 - y0
-        xp = max(1, int(math.ceil(xl / self.pattern_width)))
-        xs = xl / xp
+        xp = max(1, int(math.ceil(mrect.width / self.pattern_width)))
+        yp = max(1, int(math.ceil(mrect.height / self.pattern_slant)))
+        return xp, mrect.width / xp, yp, mrect.height / yp
+
+    def _add_slant_lines(self, p, x0, y0, xp, xs, yp, ys):
         xh = xs / 2
-        yp = max(1, int(math.ceil(yl / self.pattern_slant)))
-        ys = yl / yp
 
         def _left_tri(xo, yo, xl, yl):
             y0, y1 = yo, yo + yl
             if self.inverted:
                 y0, y1 = y1, y0
-            p = c.beginPath()
             p.moveTo(xo, y0)
             p.lineTo(xo, y1)
             p.lineTo(xo + xl, y1)
-            p.moveTo(xo, y0)
-            c.drawPath(p, stroke=1, fill=1)
 
         def _right_tri(xo, yo, xl, yl):
             y0, y1 = yo, yo + yl
             if self.inverted:
                 y0, y1 = y1, y0
-            p = c.beginPath()
             p.moveTo(xo, y0)
             p.lineTo(xo + xl, y1)
             p.lineTo(xo + xl, y0)
-            p.moveTo(xo, y0)
-            c.drawPath(p, stroke=1, fill=1)
 
-        c.setFillColor(fc)
-        c.setStrokeColor(fc)
         for i in range(xp):
             for j in range(yp):
                 xi = x0 + i * xs
@@ -111,31 +109,64 @@ class PatternRect(ContentRect):
                     _right_tri(xi, yi, xh, ys)
                     _left_tri(xi + xh, yi, xh, ys)
 
-    def _draw_squares(self, c, fc):
+    def _draw_slant_line(self, c, fc):
+        # every triangle is added as a sub-path of a single path which is
+        # then filled and stroked with one operation
         mrect = self.margin_rect
-        x0, x1 = mrect.left, mrect.right
-        y0, y1 = mrect.bottom, mrect.top
-        xl = x1 - x0
-        yl = y1 - y0
-        m = max(1, int(math.floor(yl / self.pattern_width)))
-        pw = yl / m
-        n = int(math.floor(xl / pw))
+        p = c.beginPath()
+        self._add_slant_lines(p, mrect.left, mrect.bottom, *self._slant_line_metrics())
+        c.setFillColor(fc)
+        c.setStrokeColor(fc)
+        c.drawPath(p, stroke=1, fill=1)
+
+    def _squares_metrics(self):
+        mrect = self.margin_rect
+        m = max(1, int(math.floor(mrect.height / self.pattern_width)))
+        pw = mrect.height / m
+        n = int(math.floor(mrect.width / pw))
+        return n, m, pw
+
+    def _add_squares(self, p, x0, y0, n, m, pw):
         for j in range(m):
             for i in range(n):
                 if (j + i) % 2 == 0:
-                    c.setFillColor(fc)
-                    c.setStrokeColor(fc)
-                else:
-                    continue
-                xi = x0 + i * pw
-                yi = y0 + j * pw
-                p = c.beginPath()
-                p.moveTo(xi, yi)
-                p.lineTo(xi, yi + pw)
-                p.lineTo(xi + pw, yi + pw)
-                p.lineTo(xi + pw, yi)
-                p.lineTo(xi, yi)
-                c.drawPath(p, stroke=0, fill=1)
+                    p.rect(x0 + i * pw, y0 + j * pw, pw, pw)
+
+    def _draw_squares(self, c, fc):
+        mrect = self.margin_rect
+        p = c.beginPath()
+        self._add_squares(p, mrect.left, mrect.bottom, *self._squares_metrics())
+        c.setFillColor(fc)
+        c.setStrokeColor(fc)
+        c.drawPath(p, stroke=0, fill=1)
+
+    def _fill_tiled_pattern(self, c, fc):
+        """Fills the margin rect with a PDF tiling pattern made from a single
+        repeating cell of the pattern rather than drawing every shape."""
+        mrect = self.margin_rect
+        p = PDFPathObject()
+        code = [rl_colour_code(fc), rl_colour_code(fc, stroke=True)]
+        if self.pattern == "slant-line":
+            _, xs, _, ys = self._slant_line_metrics()
+            self._add_slant_lines(p, 0, 0, 1, xs, 2, ys)
+            tile_size, paint = (xs, 2 * ys), "B*"
+            fill_rect = mrect
+            # strokes are drawn with the current line width and the cell keeps
+            # their overlap into neighbouring cells (including mitred corners)
+            line_width = getattr(c, "_lineWidth", 1)
+            code.append("%s w" % (fp_str(line_width)))
+            bleed = line_width * TILE_MITER_BLEED
+        else:
+            n, m, pw = self._squares_metrics()
+            if n < 1:
+                return
+            self._add_squares(p, 0, 0, 2, 2, pw)
+            tile_size, paint = (2 * pw, 2 * pw), "f*"
+            fill_rect = Rect(n * pw, m * pw)
+            fill_rect.move_bottom_left_to((mrect.left, mrect.bottom))
+            bleed = 0
+        tile_code = "\n".join([*code, p.getCode(), paint])
+        rl_fill_tiling_pattern(c, fill_rect, tile_size, tile_code, bleed=bleed)
 
     def draw_pattern_rect(self, c):
         bc = rl_colour(self.background_colour)
@@ -143,7 +174,9 @@ class PatternRect(ContentRect):
         mrect = self.margin_rect
         c.setFillColor(bc)
         c.rect(mrect.left, mrect.bottom, mrect.width, mrect.height, stroke=0, fill=1)
-        if self.pattern == "slant-line":
+        if self.tiled and self.pattern in ("slant-line", "squares"):
+            self._fill_tiled_pattern(c, fc)
+        elif self.pattern == "slant-line":
             self._draw_slant_line(c, fc)
         elif self.pattern == "squares":
             self._draw_squares(c, fc)
@@ -65,6 +65,7 @@ class QRCodeRect(ContentRect):
         self.format = "svg"
         self.parse_kwargs(**kwargs)
         self._qrimg = None
+        self._qrimg_key = None
 
     def __repr__(self):
         return "%s(%.2f, %.2f, %r)" % (
@@ -82,22 +83,35 @@ class QRCodeRect(ContentRect):
 
     @property
     def image_shape(self):
-        if self.is_svg:
-            return self.qr_image.pixel_size, self.qr_image.pixel_size
-        return self.qr_image._img.size
+        if self._qrimg is not None and self._qrimg_key == self.qr_image_key:
+            if self.is_svg:
+                return self.qr_image.pixel_size, self.qr_image.pixel_size
+            return self.qr_image._img.size
+        # the image size is known without rendering the QR image
+        pix = (self.qr_modules + 2 * self.border) * self.qr_box_size
+        return pix, pix
 
     @property
-    def qr_box_size(self):
+    def qr_modules(self):
+        """Returns the number of modules across the QR code symbol."""
+        key = (self.qrtext, self.qr_err_thr)
+        cache = self.__dict__.get("_qr_modules", None)
+        if cache is not None and cache[0] == key:
+            return cache[1]
         qr = qrcode.QRCode(
             version=None,
             error_correction=self.qr_err_constant,
             box_size=1,
             border=self.border,
-            image_factory=self.qr_factory,
         )
         qr.add_data(self.qrtext)
-        qr.make(fit=True)
-        sz = qr.modules_count + 2 * self.border
+        qr.best_fit()
+        self.__dict__["_qr_modules"] = (key, qr.version * 4 + 17)
+        return qr.version * 4 + 17
+
+    @property
+    def qr_box_size(self):
+        sz = self.qr_modules + 2 * self.border
         w, h = self.style.get_inset_rect(self.rect).size
         pix = PTS2PIX(min(w, h), dpi=self.dpi)
         return max(1, int(pix / sz))
@@ -128,9 +142,14 @@ class QRCodeRect(ContentRect):
         shash.update(bytes(str(self.qrtext), encoding="utf8"))
         return tempfile.gettempdir() + os.sep + shash.hexdigest()[:24]
 
+    @property
+    def qr_image_key(self):
+        return (self.qrtext, self.border, self.qr_err_thr, self.format, self.dpi)
+
     @property
     def qr_image(self):
-        if self._qrimg is not None:
+        # the cached image is only valid for the QR parameters it was made with
+        if self._qrimg is not None and self._qrimg_key == self.qr_image_key:
             return self._qrimg
         qr = qrcode.QRCode(
             version=None,
@@ -155,8 +174,10 @@ class QRCodeRect(ContentRect):
                 back_color=self.style.background_colour_tuple,
             )
         self._qrimg.save(self.qr_temp_file)
+        self._qrimg_key = self.qr_image_key
         return self._qrimg
 
+    @static_content
     def draw_in_canvas(self, c):
         self.snapshot_rect()
         self.draw_rect(c)
@@ -172,10 +193,18 @@ class QRCodeRect(ContentRect):
             return 0, 0
         if self.qrtext == "":
             return 0, 0
+        key = self.content_size_key(with_padding, self.qr_image_key)
+        size = self.memoized_size(key)
+        if size is not None:
+            return size
         tw, th = PIX2PTS(self.image_shape, self.dpi)
-        return super().get_content_size(tw, th, with_padding=with_padding)
+        size = super().get_content_size(tw, th, with_padding=with_padding)
+        return self.memoize_size(key, size)
 
     def draw_image_rect(self, c):
+        # a dry-run only needs layout, not the decoded graphics
+        if is_dry_run(c):
+            return
         if self.qrtext is None:
             return
         if self.qrtext == "":
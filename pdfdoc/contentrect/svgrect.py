@@ -28,6 +28,7 @@ from svglib.svglib import svg2rlg
 
 from toolbox import *
 from pdfdoc import *
+from pdfdoc.helpers import find_preset_file, get_preset_files
 
 
 class SvgRect(ContentRect):
@@ -59,6 +60,7 @@ class SvgRect(ContentRect):
         s.append("  filename: %s" % (self.filename))
         return "\n".join(s)
 
+    @static_content
     def draw_in_canvas(self, c):
         self.snapshot_rect()
         self.draw_rect(c)
@@ -74,12 +76,22 @@ class SvgRect(ContentRect):
             return 0, 0
         if self.filename == "":
             return 0, 0
+        key = self.content_size_key(
+            with_padding, self.filename, get_file_mtime(self.filename)
+        )
+        size = self.memoized_size(key)
+        if size is not None:
+            return size
         dwg = svg2rlg(self.filename)
-        return super().get_content_size(
+        size = super().get_content_size(
             dwg.minWidth(), dwg.height, with_padding=with_padding
         )
+        return self.memoize_size(key, size)
 
     def draw_svg_rect(self, c):
+        # a dry-run only needs layout, not the decoded graphics
+        if is_dry_run(c):
+            return
         if self.filename is None:
             return
         if self.filename == "":
@@ -103,26 +115,14 @@ class SvgRect(ContentRect):
     def from_preset(name, **kwargs):
         """Returns an instance of SvgRect from a named preset graphic included
         in this package."""
-        if not name.endswith(".svg"):
-            name = name + ".svg"
-        presets = SvgRect.list_presets()
-        for preset in presets:
-            _, pf = split_path(preset)
-            if pf == name:
-                return SvgRect(filename=preset, **kwargs)
+        preset = find_preset_file(name, ".svg")
+        if preset is not None:
+            return SvgRect(filename=preset, **kwargs)
         raise ValueError("Cannot find preset SVG named %s" % (name))
 
     @staticmethod
     def list_presets(as_files=True):
-        fp, _ = split_path(__file__)
-        fp = fp + os.sep + ".." + os.sep + "graphics"
-        fp = os.path.abspath(fp)
-        fs = FileOps()
-        files = fs.get_file_list(fp, "*.svg", recursive=True)
-        presets = []
-        for file in files:
-            if str(file).lower().endswith(".svg"):
-                presets.append(str(file))
+        presets = get_preset_files(".svg")
         if as_files:
-            return sorted(presets)
+            return presets
         return sorted([os.path.basename(f).replace(".svg", "") for f in presets])
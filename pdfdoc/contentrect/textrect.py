@@ -82,6 +82,22 @@ class TextRect(ContentRect):
             return 0, 0
         if len(self.text) == 0:
             return 0, 0
+        # the available space only matters if the text is fitted to it
+        fit_width = self.split_lines or self.shrink_to_fit or self.expand_to_fit
+        fit_height = self.shrink_to_fit or self.expand_to_fit
+        key = self.content_size_key(
+            with_padding,
+            self.text,
+            self.split_lines,
+            self.shrink_to_fit,
+            self.expand_to_fit,
+            self.rect.width if fit_width else None,
+            self.rect.height if fit_height else None,
+        )
+        memo = self.memoized_size(key)
+        if memo is not None:
+            self._multi_line = memo[1]
+            return memo[0]
         text_width = self.rect.width
         font_size = self.font_size
         if self.shrink_to_fit:
@@ -101,8 +117,10 @@ class TextRect(ContentRect):
         for line in lines:
             max_width = max(max_width, self.style.string_width(line, font_size))
             height += self.style.line_height
-        return super().get_content_size(max_width, height, with_padding=with_padding)
+        size = super().get_content_size(max_width, height, with_padding=with_padding)
+        return self.memoize_size(key, (size, self._multi_line))[0]
 
+    @static_content
     def draw_in_canvas(self, c):
         self.snapshot_rect()
         self.draw_rect(c)
@@ -0,0 +1,244 @@
+#! /usr/bin/env python3
+#
+# Copyright (C) 2020  Michael Gale
+
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# DocumentFlow class for flowing rows of content across columns and pages
+
+from itertools import islice
+
+import numpy as np
+
+from toolbox import *
+from pdfdoc import *
+
+
+class DocumentFlow:
+    """Flows rows of content into the columns and pages of a Document.  Each row
+    is measured once at the width of the current column and drawn at the
+    document cursor.  When a row does not fit in the remaining height, the
+    document breaks to the next column (or page) and the header rows are
+    repeated at the top of the new column.  Rows are drawn as soon as they are
+    placed and are not retained, so rows can be supplied by a generator.
+    A row is either a single content object which spans the column or a list
+    of content objects placed left to right at their content size."""
+
+    def __init__(self, doc, header=None):
+        self.doc = doc
+        self.header = [] if header is None else list(header)
+        self.row_count = 0
+        self.fragment_count = 0
+        self.overflow_count = 0
+        self._fragment_rows = 0
+        self._header_items = {}
+
+    def __repr__(self):
+        return "%s(rows=%d, fragments=%d, overflows=%d)" % (
+            self.__class__.__name__,
+            self.row_count,
+            self.fragment_count,
+            self.overflow_count,
+        )
+
+    @property
+    def column_width(self):
+        return self.doc.get_current_column_rect().right - self.doc.cursor[0]
+
+    @staticmethod
+    def measure_row(row, width):
+        """Returns a list of (content, width, height) for each content object in
+        a row and the overall height of the row."""
+        if isinstance(row, (list, tuple)):
+            items = [(content, *content.get_content_size()) for content in row]
+        else:
+            row.size = (width, row.rect.height)
+            _, h = row.get_content_size()
+            items = [(row, width, h)]
+        return items, max([h for _, _, h in items], default=0)
+
+    def _get_header(self, width):
+        if width not in self._header_items:
+            self._header_items[width] = [
+                self.measure_row(row, width) for row in self.header
+            ]
+        return self._header_items[width]
+
+    def _draw_items(self, items, height):
+        x, y = self.doc.cursor
+        for content, w, h in items:
+            content.size = (w, h)
+            content.top_left = (x, y)
+            content.draw_in_canvas(self.doc.c)
+            x += w
+        self.doc.cursor_shift_down(height)
+
+    def _start_fragment(self):
+        self.fragment_count += 1
+        self._fragment_rows = 0
+        for items, height in self._get_header(self.column_width):
+            self._draw_items(items, height)
+
+    def add_row(self, row):
+        """Measures and draws a row, breaking to a new column if required."""
+        items, height = self.measure_row(row, self.column_width)
+        self.add_measured_row(items, height, row=row)
+
+    def add_measured_row(self, items, height, row=None):
+        doc = self.doc
+        if self.fragment_count == 0:
+            header = sum(h for _, h in self._get_header(self.column_width))
+            if not doc.is_enough_height(header + height):
+                if not doc.is_cursor_at_column_start():
+                    doc.column_break()
+                    items, height = self._remeasure(items, height, row)
+            self._start_fragment()
+        elif self._fragment_rows > 0 and not doc.is_enough_height(height):
+            doc.column_break()
+            items, height = self._remeasure(items, height, row)
+            self._start_fragment()
+        if not doc.is_enough_height(height):
+            # a row taller than an empty column is drawn regardless
+            self.overflow_count += 1
+        self._draw_items(items, height)
+        self._fragment_rows += 1
+        self.row_count += 1
+
+    def _remeasure(self, items, height, row):
+        # a spanning row is only measured again if the column width changed
+        if row is None or isinstance(row, (list, tuple)):
+            return items, height
+        if abs(items[0][1] - self.column_width) > 1e-6:
+            return self.measure_row(row, self.column_width)
+        return items, height
+
+    def flow(self, rows):
+        """Flows an iterable of rows and returns self."""
+        for row in rows:
+            self.add_row(row)
+        return self
+
+    def flow_table(self, table, header_rows=0):
+        """Flows the rows of a TableColumn or the cells of any other TableVector
+        container.  The first header_rows rows of the table are repeated at the
+        top of each column.  The rows of a TableColumn are its cells and the
+        rows of any other container are its cells packed left to right into
+        rows which fit the column width."""
+        if isinstance(table, TableColumn):
+            return self.flow_column(table, header_rows=header_rows)
+        rows = self._packed_rows(cell.content for cell in table.iter_cells())
+        header = islice(rows, header_rows)
+        self.header = [[content for content, _, _ in items] for items, _ in header]
+        for items, height in rows:
+            self.add_measured_row(items, height)
+        return self
+
+    def flow_packed(self, contents):
+        """Packs content objects left to right into rows which fit the column
+        width and flows the rows.  Each content object is measured once."""
+        for items, height in self._packed_rows(contents):
+            self.add_measured_row(items, height)
+        return self
+
+    def _packed_rows(self, contents):
+        band, band_width, band_height = [], 0, 0
+        for content in contents:
+            w, h = content.get_content_size()
+            if band and band_width + w > self.column_width + 1e-6:
+                yield band, band_height
+                band, band_width, band_height = [], 0, 0
+            band.append((content, w, h))
+            band_width += w
+            band_height = max(band_height, h)
+        if band:
+            yield band, band_height
+
+    def measure_table_row(self, table, cell, width):
+        """Returns the height of a TableColumn cell at the column width.  Row
+        heights which are a fraction of the table height are sized from the
+        height of the table and all other rows are sized to their content."""
+        inset = table.style.get_inset_rect(Rect(width, table.rect.height))
+        if cell.height > 0:
+            return cell.height * inset.height
+        cell.content.size = (inset.width, cell.content.rect.height)
+        return cell.content.get_content_size()[1]
+
+    def flow_column(self, table, header_rows=0):
+        """Flows the rows of a TableColumn in cell order.  Each column fragment
+        is drawn as the table sized to its rows, i.e. with the background,
+        padding and border lines of the table style.  Only the rows of the
+        current fragment are retained."""
+        doc = self.doc
+        cells = table.iter_cells()
+        header = list(islice(cells, header_rows))
+        headers = {}
+        pad = table.style.height_pad_margin
+
+        def _header(width):
+            if width not in headers:
+                headers[width] = [
+                    (cell, self.measure_table_row(table, cell, width))
+                    for cell in header
+                ]
+            return headers[width], sum(h for _, h in headers[width])
+
+        fragment, width = [], self.column_width
+        used = _header(width)[1] + pad
+        for cell in cells:
+            height = self.measure_table_row(table, cell, width)
+            if not doc.is_enough_height(used + height):
+                if fragment:
+                    self._draw_table_fragment(table, _header(width)[0] + fragment)
+                    fragment = []
+                    doc.column_break()
+                elif self.fragment_count == 0 and not doc.is_cursor_at_column_start():
+                    doc.column_break()
+                if abs(self.column_width - width) > 1e-6:
+                    width = self.column_width
+                    height = self.measure_table_row(table, cell, width)
+                used = _header(width)[1] + pad
+                if not doc.is_enough_height(used + height):
+                    # a row taller than an empty column is drawn regardless
+                    self.overflow_count += 1
+            fragment.append((cell, height))
+            used += height
+            self.row_count += 1
+        if fragment:
+            self._draw_table_fragment(table, _header(width)[0] + fragment)
+        return self
+
+    def _draw_table_fragment(self, table, rows):
+        c = self.doc.c
+        height = sum(h for _, h in rows) + table.style.height_pad_margin
+        rect = Rect(self.column_width, height)
+        rect.move_top_left_to(self.doc.cursor)
+        inset = table.style.get_inset_rect(rect)
+        heights = np.array([h for _, h in rows])
+        rects = RectArray.from_sizes(np.full(len(rows), inset.width), heights)
+        rects.stack(inset, "height", reverse=table.style["vert-align"] == "bottom")
+        rects.write_to([cell.content.rect for cell, _ in rows])
+        table_rect, table.rect = table.rect, rect
+        table.draw_background(c)
+        for cell, _ in rows:
+            cell.content.draw_in_canvas(c)
+        table.draw_border_lines(c)
+        table.rect = table_rect
+        self.doc.cursor_shift_down(rect.height)
+        self.fragment_count += 1
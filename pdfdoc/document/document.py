@@ -23,15 +23,20 @@
 #
 # Document container class
 
+from itertools import islice
+
 from reportlab.pdfgen import canvas
 
 from toolbox import *
 from pdfdoc import *
 from .doccallbacks import DocumentCallback
+from .docflow import DocumentFlow
+from .nullcanvas import NullCanvas
+from .statecanvas import StateCanvas
 
 
 class Document:
-    def __init__(self, filename=None, style=None):
+    def __init__(self, filename=None, style=None, dry_run=False):
         self.style = DocStyle(style=DEFAULT_MARGINS)
         self.filename = filename if filename is not None else ""
         self.title = None
@@ -66,6 +71,11 @@ class Document:
         self.chapter = 1
         self.page_count = 0
         self.last_page = False
+        # layout-only document generation without PDF output
+        self.dry_run = dry_run
+        # default resolution for embedded images, None embeds at full resolution
+        self.embed_dpi = None
+        self.canvas_report = None
 
     def __repr__(self):
         return "%s(%r, %r)" % (
@@ -439,6 +449,33 @@ class Document:
     def change_section(self, new_section=None):
         self.section_break(new_section=new_section, page_break=False)
 
+    def flow(self, content, header_rows=0):
+        """Flows the rows of a TableColumn, the cells of a TableGrid or an
+        iterable of rows into the columns and pages of this document starting
+        at the cursor.  The first header_rows rows (rows of packed cells for a
+        TableGrid) are repeated in each column.  Returns the DocumentFlow
+        describing the result."""
+        flow = DocumentFlow(self)
+        if isinstance(content, TableVector):
+            return flow.flow_table(content, header_rows=header_rows)
+        rows = iter(content)
+        flow.header = list(islice(rows, header_rows))
+        return flow.flow(rows)
+
+    def layout_report(self):
+        """Returns a dictionary summary of the most recently generated document
+        layout.  Canvas operation counts are included for dry-run documents."""
+        report = {
+            "pages": self.page_count,
+            "page_number": self.page_number,
+            "section": self.section,
+            "num_columns": self.num_columns,
+            "dry_run": self.dry_run,
+        }
+        if self.canvas_report is not None:
+            report["canvas"] = self.canvas_report
+        return report
+
     def end_document(self):
         self._doc_end()
 
@@ -493,9 +530,13 @@ class Document:
 
     def _doc_start(self):
         """Initialize state for document creation start."""
-        self.c = canvas.Canvas(
-            self.filename, pagesize=(self.bleed_rect.width, self.bleed_rect.height)
-        )
+        pagesize = (self.bleed_rect.width, self.bleed_rect.height)
+        if self.dry_run:
+            self.c = NullCanvas(self.filename, pagesize=pagesize)
+        else:
+            self.c = canvas.Canvas(self.filename, pagesize=pagesize)
+        self.c = StateCanvas(self.c)
+        set_canvas_image_dpi(self.c, self.embed_dpi)
         if self.author is not None:
             self.c.setAuthor(self.author)
         if self.title is not None:
@@ -522,6 +563,8 @@ class Document:
         self.c.showPage()
         self.c.save()
         self.page_count += 1
+        if is_dry_run(self.c):
+            self.canvas_report = self.c.report()
         self.c = None
 
     def _section_start(self):
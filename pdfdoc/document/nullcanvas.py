@@ -0,0 +1,140 @@
+#! /usr/bin/env python3
+#
+# Copyright (C) 2020  Michael Gale
+
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# NullCanvas class for layout-only (dry-run) document generation
+
+from collections import Counter
+
+from reportlab.pdfbase import pdfmetrics
+
+from toolbox import *
+from pdfdoc import *
+
+
+class _NullObject:
+    """Stand-in for canvas path and text objects which ignores all operations."""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: None
+
+
+class NullCanvas:
+    """A drop-in replacement for a reportlab Canvas which ignores all drawing
+    operations.  Drawing content with a NullCanvas runs the complete layout of
+    content and containers without emitting any PDF output.  Content classes
+    check is_dry_run to skip decoding and embedding images and graphics.
+    The number of each type of canvas operation and pages is recorded."""
+
+    is_dry_run = True
+
+    def __init__(self, filename=None, pagesize=None, **kwargs):
+        self._filename = filename
+        self._pagesize = pagesize
+        self._enforceColorSpace = None
+        self._fontname = DEF_FONT_NAME
+        self._fontsize = 10
+        self.page_count = 0
+        self.ops = Counter()
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self._filename)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def _null_op(*args, **kwargs):
+            self.ops[name] += 1
+
+        return _null_op
+
+    def setFont(self, psfontname, size, leading=None):
+        self.ops["setFont"] += 1
+        self._fontname = psfontname
+        self._fontsize = size
+
+    def stringWidth(self, text, fontName=None, fontSize=None):
+        fontName = fontName if fontName is not None else self._fontname
+        fontSize = fontSize if fontSize is not None else self._fontsize
+        return pdfmetrics.stringWidth(text, fontName, fontSize)
+
+    def beginPath(self):
+        self.ops["beginPath"] += 1
+        return _NullObject()
+
+    def beginText(self, x=0, y=0, direction=None):
+        self.ops["beginText"] += 1
+        return _NullObject()
+
+    def showPage(self):
+        self.ops["showPage"] += 1
+        self.page_count += 1
+
+    def save(self):
+        self.ops["save"] += 1
+
+    def report(self):
+        """Returns a dictionary summary of the operations drawn on this canvas."""
+        return {
+            "pages": self.page_count,
+            "operations": sum(self.ops.values()),
+            "operation_counts": dict(self.ops),
+            "culled": get_culled_count(self),
+        }
+
+
+def _rect_tuple(rect):
+    return tuple(round(v, 3) for v in (rect.left, rect.top, rect.right, rect.bottom))
+
+
+def layout_report(content, label=None, tol=1e-2):
+    """Returns a nested dictionary describing the computed geometry of content
+    and its children.  Containers report their clipped and overlapped cells and
+    TextRect content reports whether its text fits within its rect."""
+    report = {
+        "type": content.__class__.__name__,
+        "rect": _rect_tuple(content.rect),
+    }
+    if label is not None:
+        report["label"] = label
+    if isinstance(content, TableVector):
+        report["clipped_cells"] = content.get_clipped_cells(tol=tol)
+        report["overlapped_cells"] = content.get_overlapped_cells()
+        report["cells"] = [
+            layout_report(cell.content, label=cell.label, tol=tol)
+            for cell in content.iter_cells()
+        ]
+        report["fits"] = not (report["clipped_cells"] or report["overlapped_cells"])
+        report["fits"] = report["fits"] and all(c["fits"] for c in report["cells"])
+    elif isinstance(content, TextRect):
+        w, h = content.get_content_size()
+        report["content_size"] = (round(w, 3), round(h, 3))
+        report["multi_line"] = content.is_multi_line
+        report["fits"] = (
+            w <= content.rect.width + tol and h <= content.rect.height + tol
+        )
+    else:
+        report["fits"] = True
+    return report
@@ -0,0 +1,158 @@
+#! /usr/bin/env python3
+#
+# Copyright (C) 2020  Michael Gale
+
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# StateCanvas proxy which suppresses redundant graphics state operators
+
+from collections import Counter
+
+from reportlab.lib.colors import Color
+
+
+def _colour_key(colour, alpha):
+    if isinstance(colour, Color):
+        return colour.__class__, colour.__key__, alpha
+    if isinstance(colour, list):
+        colour = tuple(colour)
+    return type(colour), colour, alpha
+
+
+class StateCanvas:
+    """A proxy for a reportlab Canvas (or NullCanvas) which tracks the graphics
+    state set by the fill/stroke colour, line width, dash and font operators.
+    An operator which would set a value already in effect is not passed to the
+    canvas.  The tracked state follows saveState/restoreState, forms and pages
+    and starts out unknown so that the first operator is always emitted.  The
+    number of suppressed operators of each type is recorded in suppressed.
+    Every other attribute and method is that of the wrapped canvas."""
+
+    def __init__(self, canvas):
+        self.__dict__["canvas"] = canvas
+        self.__dict__["suppressed"] = Counter()
+        self.__dict__["_state"] = {}
+        self.__dict__["_state_stack"] = []
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self.canvas)
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__["canvas"], name)
+
+    def __setattr__(self, name, value):
+        setattr(self.canvas, name, value)
+
+    @property
+    def suppressed_count(self):
+        return sum(self.suppressed.values())
+
+    def _set_state(self, op, key, *args, **kwargs):
+        if op in self._state and self._state[op] == key:
+            self.suppressed[op] += 1
+            return
+        self._state[op] = key
+        getattr(self.canvas, op)(*args, **kwargs)
+
+    def setFillColor(self, aColor, alpha=None):
+        self._set_state("setFillColor", _colour_key(aColor, alpha), aColor, alpha)
+
+    def setStrokeColor(self, aColor, alpha=None):
+        self._set_state("setStrokeColor", _colour_key(aColor, alpha), aColor, alpha)
+
+    def setFillColorRGB(self, r, g, b, alpha=None):
+        self.setFillColor((r, g, b), alpha=alpha)
+
+    def setStrokeColorRGB(self, r, g, b, alpha=None):
+        self.setStrokeColor((r, g, b), alpha=alpha)
+
+    def setFillColorCMYK(self, c, m, y, k, alpha=None):
+        self.setFillColor((c, m, y, k), alpha=alpha)
+
+    def setStrokeColorCMYK(self, c, m, y, k, alpha=None):
+        self.setStrokeColor((c, m, y, k), alpha=alpha)
+
+    def setFillGray(self, gray, alpha=None):
+        self._state.pop("setFillColor", None)
+        self.canvas.setFillGray(gray, alpha=alpha)
+
+    def setStrokeGray(self, gray, alpha=None):
+        self._state.pop("setStrokeColor", None)
+        self.canvas.setStrokeGray(gray, alpha=alpha)
+
+    def setFillAlpha(self, a):
+        self._state.pop("setFillColor", None)
+        self.canvas.setFillAlpha(a)
+
+    def setStrokeAlpha(self, a):
+        self._state.pop("setStrokeColor", None)
+        self.canvas.setStrokeAlpha(a)
+
+    def setLineWidth(self, width):
+        self._set_state("setLineWidth", width, width)
+
+    def setDash(self, array=[], phase=0):
+        key = (tuple(array) if isinstance(array, (list, tuple)) else array, phase)
+        self._set_state("setDash", key, array, phase)
+
+    def setFont(self, psfontname, size, leading=None):
+        key = (psfontname, size, leading if leading is not None else size * 1.2)
+        self._set_state("setFont", key, psfontname, size, leading)
+
+    def setFontSize(self, size=None, leading=None):
+        self._state.pop("setFont", None)
+        self.canvas.setFontSize(size, leading)
+
+    def drawText(self, aTextObject):
+        # text objects can change the fill and stroke colour and font
+        for op in ("setFillColor", "setStrokeColor", "setFont"):
+            self._state.pop(op, None)
+        self.canvas.drawText(aTextObject)
+
+    def saveState(self):
+        self._state_stack.append(dict(self._state))
+        self.canvas.saveState()
+
+    def restoreState(self):
+        self.canvas.restoreState()
+        self.__dict__["_state"] = self._state_stack.pop() if self._state_stack else {}
+
+    def beginForm(self, *args, **kwargs):
+        # a form is a separate content stream starting from the default state
+        self._state_stack.append(dict(self._state))
+        self.__dict__["_state"] = {}
+        self.canvas.beginForm(*args, **kwargs)
+
+    def endForm(self, **kwargs):
+        self.canvas.endForm(**kwargs)
+        self.__dict__["_state"] = self._state_stack.pop() if self._state_stack else {}
+
+    def showPage(self):
+        self.__dict__["_state"] = {}
+        self.__dict__["_state_stack"] = []
+        self.canvas.showPage()
+
+    def report(self):
+        """Returns the report of the wrapped canvas (if it has one) with the
+        counts of suppressed operators."""
+        report = self.canvas.report() if hasattr(self.canvas, "report") else {}
+        report["suppressed"] = self.suppressed_count
+        report["suppressed_counts"] = dict(self.suppressed)
+        return report
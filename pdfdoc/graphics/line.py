@@ -23,9 +23,56 @@
 #
 # Styled line
 
+import re
+
+import numpy as np
+from reportlab.pdfgen.pathobject import PDFPathObject
+
 from toolbox import *
 from pdfdoc import *
-from pdfdoc.helpers import line_angle, line_mid_point
+from pdfdoc.helpers import line_angle, line_mid_point, simplify_polyline
+
+# fixed point formats used by reportlab's fp_str indexed by number of decimals
+_FP_FORMATS = np.array(["%%.%df" % i for i in range(7)])
+_FP_TRAILING_ZEROS = re.compile(r"(\.\d*?)0+(?= |$)")
+_FP_TRAILING_POINT = re.compile(r"\.(?= |$)")
+_FP_LEADING_ZERO = re.compile(r"(^| )0\.")
+
+
+def _fp_line_code(pts):
+    """Returns the line segment operators to each point of an N x 2 array with
+    the coordinates formatted in bulk exactly as reportlab's fp_str does."""
+    v = np.array(pts, dtype=float).ravel()
+    sa = np.abs(v)
+    v[sa <= 1e-7] = 0
+    magnitude = np.floor(np.log10(np.maximum(sa, 1))).astype(int)
+    decimals = np.where(sa <= 1, 6, np.clip(6 - magnitude, 0, 6))
+    fmts = np.column_stack(
+        (_FP_FORMATS[decimals].reshape(-1, 2), np.full(len(v) // 2, "l"))
+    )
+    code = " ".join(fmts.ravel().tolist()) % tuple(v.tolist())
+    code = _FP_TRAILING_ZEROS.sub(r"\1", code)
+    code = _FP_TRAILING_POINT.sub("", code)
+    return _FP_LEADING_ZERO.sub(r"\1.", code)
+
+
+class _PolylinePath(PDFPathObject):
+    """A reportlab path object which can add a whole polyline at once with its
+    line segment operators formatted in bulk rather than point by point."""
+
+    def polyline(self, coords):
+        pts = np.asarray(coords, dtype=float).reshape(-1, 2)
+        if len(pts) < 2:
+            return
+        self.moveTo(*pts[0].tolist())
+        self._code_append(_fp_line_code(pts[1:]))
+
+
+def _begin_polyline_path(c):
+    # a dry-run canvas path ignores all operations so is used as is
+    if is_dry_run(c):
+        return c.beginPath()
+    return _PolylinePath()
 
 
 class StyledLine(DocStyleMixin):
@@ -76,6 +123,42 @@ class StyledLine(DocStyleMixin):
             self._draw_arrow_head(c, coords[-1], coords[-2])
         self._reset_line_style(c)
 
+    def draw_trace(self, c, coords, tolerance=None, arrow0=False, arrow1=False):
+        """Draws a polyline from a (possibly very large) sequence or N x 2 array
+        of coordinates.  If a tolerance is specified (e.g. 72 / dpi points for
+        one device pixel), the polyline is first simplified so that detail
+        finer than the tolerance is discarded."""
+        pts = simplify_polyline(coords, tolerance)
+        if len(pts) < 2:
+            return
+        self._prepare_line_style(c)
+        c0, c1 = pts[0], pts[-1]
+        if arrow0:
+            c0 = self.arrow.tip_offset(pts[0], pts[1], self.line_width)
+        if arrow1:
+            c1 = self.arrow.tip_offset(pts[-1], pts[-2], self.line_width)
+        line = pts.copy()
+        line[0], line[-1] = c0, c1
+        p = _begin_polyline_path(c)
+        p.polyline(line)
+        c.drawPath(p, stroke=1, fill=0)
+        if arrow0:
+            self._draw_arrow_head(c, pts[0], pts[1])
+        if arrow1:
+            self._draw_arrow_head(c, pts[-1], pts[-2])
+        self._reset_line_style(c)
+
+    def draw_polylines(self, c, polylines):
+        """Draws many independent polylines sharing this line's style.  Each
+        polyline is a sequence of (x, y) coordinates (or an N x 2 array) and is
+        added as a sub-path of a single path which is stroked once."""
+        self._prepare_line_style(c)
+        p = _begin_polyline_path(c)
+        for coords in polylines:
+            p.polyline(coords)
+        c.drawPath(p, stroke=1, fill=0)
+        self._reset_line_style(c)
+
     def _prepare_line_style(self, c):
         if isinstance(self.dash, list):
             c.setDash(array=self.dash)
@@ -181,18 +264,19 @@ class StyledLine(DocStyleMixin):
             c.setDash(array=line.style["grid-dash"])
         else:
             c.setDash(*line.style["grid-dash"])
+        # every grid line is a sub-path of a single path so that the whole
+        # grid is stroked with one operator (the dash pattern restarts at
+        # each sub-path so the appearance is unchanged)
+        p = c.beginPath()
         yc = yo + ny * ys
         for x in range(nx + 1):
-            p = c.beginPath()
             xc = xo + x * xs
             p.moveTo(xc, yo)
             p.lineTo(xc, yc)
-            c.drawPath(p, stroke=1, fill=0)
         xc = xo + nx * xs
         for y in range(ny + 1):
-            p = c.beginPath()
             yc = yo + y * ys
             p.moveTo(xo, yc)
             p.lineTo(xc, yc)
-            c.drawPath(p, stroke=1, fill=0)
+        c.drawPath(p, stroke=1, fill=0)
         c.setDash([])
@@ -27,24 +27,56 @@ import math
 import string
 import subprocess, shlex
 import shutil
+import stat
 import tempfile
+from collections import OrderedDict
 
+import numpy as np
 from PIL import Image
 from pathlib import Path
 import fitz
 
 from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.pdfdoc import (
+    PDFArray,
+    PDFFormXObject,
+    PDFName,
+    PDFObjectReference,
+    PDFResourceDictionary,
+    PDFStream,
+)
 from reportlab.lib.colors import Color, CMYKColor
+from reportlab.lib.rl_accel import fp_str
+from reportlab.lib.utils import ImageReader
 
 
 from toolbox import *
 
+# reportlab colour objects made by rl_colour keyed by their value
+_rl_colours = {}
+_RL_COLOURS_MAX = 4096
+
 
 def rl_colour(from_colour, alpha=None):
-    if isinstance(from_colour, str):
-        return rl_colour_hex(from_colour)
     if isinstance(from_colour, (Color, CMYKColor)):
         return from_colour
+    if isinstance(from_colour, (str, list, tuple)):
+        key = (
+            from_colour if isinstance(from_colour, str) else tuple(from_colour),
+            alpha,
+        )
+        colour = _rl_colours.get(key, None)
+        if colour is None:
+            colour = _make_rl_colour(from_colour, alpha)
+            if len(_rl_colours) < _RL_COLOURS_MAX:
+                _rl_colours[key] = colour
+        return colour
+    return None
+
+
+def _make_rl_colour(from_colour, alpha=None):
+    if isinstance(from_colour, str):
+        return rl_colour_hex(from_colour)
     if isinstance(from_colour, (list, tuple)):
         alpha = alpha if alpha is not None else 1.0
         if len(from_colour) == 3:
@@ -77,6 +109,128 @@ def rl_colour_hex(hexstr, alpha=1.0):
     return Color(r, g, b, alpha=alpha)
 
 
+def is_dry_run(c):
+    """Returns True if c is a canvas which only records layout (NullCanvas)."""
+    return getattr(c, "is_dry_run", False)
+
+
+def set_canvas_viewport(c, rect):
+    """Limits drawing on canvas c to content which intersects rect.  Containers
+    skip drawing (and loading the resources of) any cell which lies entirely
+    outside rect.  A rect of None removes the viewport.  The count of culled
+    objects is reset."""
+    c._pdfdoc_viewport = rect
+    c._pdfdoc_culled = 0
+
+
+def get_canvas_viewport(c):
+    return getattr(c, "_pdfdoc_viewport", None)
+
+
+def get_culled_count(c):
+    """Returns the number of objects which were not drawn on canvas c because
+    they were outside its viewport."""
+    return getattr(c, "_pdfdoc_culled", 0)
+
+
+def is_culled(c, rect):
+    """Returns True if rect lies entirely outside the viewport of canvas c and
+    counts it as a culled object."""
+    vp = getattr(c, "_pdfdoc_viewport", None)
+    if vp is None:
+        return False
+    if (
+        rect.right < vp.left
+        or rect.left > vp.right
+        or rect.top < vp.bottom
+        or rect.bottom > vp.top
+    ):
+        c._pdfdoc_culled = get_culled_count(c) + 1
+        return True
+    return False
+
+
+def set_canvas_image_dpi(c, dpi):
+    """Sets the default resolution at which images drawn on canvas c are
+    embedded.  Images with a higher effective resolution at their placed size
+    are downsampled.  A dpi of None embeds images at full resolution."""
+    c._pdfdoc_image_dpi = dpi
+
+
+def get_canvas_image_dpi(c):
+    return getattr(c, "_pdfdoc_image_dpi", None)
+
+
+def rl_colour_code(colour, stroke=False):
+    """Returns the PDF content stream operator which sets colour as the fill
+    colour (or the stroke colour if stroke is True)."""
+    colour = rl_colour(colour)
+    if isinstance(colour, CMYKColor):
+        values = colour.cyan, colour.magenta, colour.yellow, colour.black
+        op = "K" if stroke else "k"
+    else:
+        values = colour.red, colour.green, colour.blue
+        op = "RG" if stroke else "rg"
+    return "%s %s" % (fp_str(*values), op)
+
+
+def rl_fill_tiling_pattern(c, rect, tile_size, tile_code, bleed=0):
+    """Fills rect with a PDF tiling pattern whose cell of tile_size (width, height)
+    is painted by the content stream operators in tile_code.  The pattern phase
+    starts at the bottom left corner of rect.  Content which extends beyond its
+    cell by up to bleed (e.g. stroked lines) overlaps the neighbouring cells
+    but is still clipped to rect.  Each pattern is defined once per document
+    and the fill of each size of rect is a form XObject, so repeated fills only
+    emit a single Do operator."""
+    tw, th = tile_size
+    c.saveState()
+    c.translate(rect.left, rect.bottom)
+    if is_dry_run(c):
+        c.doForm("pattern")
+        c.restoreState()
+        return
+    doc = c._doc
+    if getattr(doc, "_pdfdoc_patterns", None) is None:
+        doc._pdfdoc_patterns = {}
+        doc._pdfdoc_pattern_fills = {}
+    pattern_key = (fp_str(tw, th, bleed), tile_code)
+    if pattern_key not in doc._pdfdoc_patterns:
+        name = "P%d" % (len(doc._pdfdoc_patterns))
+        pattern = PDFStream(content=tile_code)
+        pattern.dictionary["Type"] = PDFName("Pattern")
+        pattern.dictionary["PatternType"] = 1
+        pattern.dictionary["PaintType"] = 1
+        pattern.dictionary["TilingType"] = 1
+        pattern.dictionary["BBox"] = PDFArray([-bleed, -bleed, tw + bleed, th + bleed])
+        pattern.dictionary["XStep"] = tw
+        pattern.dictionary["YStep"] = th
+        pattern.dictionary["Resources"] = PDFResourceDictionary()
+        doc.Reference(pattern, "pdfdoc.Pattern.%s" % (name))
+        doc._pdfdoc_patterns[pattern_key] = name
+    name = doc._pdfdoc_patterns[pattern_key]
+    fill_key = (name, fp_str(rect.width, rect.height))
+    if fill_key not in doc._pdfdoc_pattern_fills:
+        form_name = "pdfdoc_%s_%d" % (name, len(doc._pdfdoc_pattern_fills))
+        form = PDFFormXObject(0, 0, rect.width, rect.height)
+        form.compression = c._pageCompression
+        form.setStreamList(
+            [
+                "/Pattern cs /%s scn" % (name),
+                "0 0 %s re f" % (fp_str(rect.width, rect.height)),
+            ]
+        )
+        form.Resources = PDFResourceDictionary()
+        form.Resources.Pattern = {
+            name: PDFObjectReference("pdfdoc.Pattern.%s" % (name))
+        }
+        in_object = doc.inObject
+        doc.addForm(form_name, form)
+        doc.inObject = in_object
+        doc._pdfdoc_pattern_fills[fill_key] = form_name
+    c.doForm(doc._pdfdoc_pattern_fills[fill_key])
+    c.restoreState()
+
+
 def canvas_save_state(c, x, y, a):
     c.saveState()
     c.translate(x, y)
@@ -210,14 +364,177 @@ def get_string_asc_des(c, label, fontname, fontsize):
     return (ascent * fontsize, descent * fontsize)
 
 
+def get_string_widths(labels, fontname, fontsize):
+    """Returns a NumPy array of the widths of a list of strings drawn in the
+    same font.  Each distinct character is measured once and the width of
+    every string is summed from these in a single vectorized pass."""
+    widths = np.zeros(len(labels))
+    text = "".join(labels)
+    if len(text) == 0:
+        return widths
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    chars, inverse = np.unique(codes, return_inverse=True)
+    char_widths = np.array(
+        [pdfmetrics.stringWidth(chr(ch), fontname, fontsize) for ch in chars]
+    )
+    acc = np.concatenate(([0.0], np.cumsum(char_widths[inverse])))
+    lengths = np.array([len(label) for label in labels])
+    ends = np.cumsum(lengths)
+    return acc[ends] - acc[ends - lengths]
+
+
+# image metadata cached by get_image_info keyed by path, mtime and file size
+IMAGE_INFO_CACHE_SIZE = 1024
+_image_info = OrderedDict()
+# decoded image pixels cached by get_image_pixels within a memory budget
+IMAGE_PIXEL_CACHE_BYTES = 256 * 1024 * 1024
+_image_pixels = OrderedDict()
+# images resampled for embedding by get_resampled_image
+RESAMPLED_IMAGE_CACHE_SIZE = 64
+_resampled_images = OrderedDict()
+
+
+def _image_key(filename):
+    """Returns a cache key for an image file or None if it is not a file."""
+    try:
+        st = Path(filename).stat()
+    except (OSError, TypeError, ValueError):
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return str(filename), st.st_mtime, st.st_size
+
+
+def get_image_info(filename):
+    """Returns a dictionary describing the width, height, mode and alpha
+    channel presence of an image file or None if the file does not exist.
+    Only the image header is read and the result is cached until the file
+    changes."""
+    key = _image_key(filename)
+    if key is None:
+        return None
+    if key in _image_info:
+        _image_info.move_to_end(key)
+        return _image_info[key]
+    with Image.open(filename) as im:
+        info = {
+            "width": im.size[0],
+            "height": im.size[1],
+            "mode": im.mode,
+            "has_alpha": im.mode in ("RGBA", "LA", "PA", "RGBa", "La")
+            or "transparency" in im.info,
+        }
+    _image_info[key] = info
+    while len(_image_info) > max(1, IMAGE_INFO_CACHE_SIZE):
+        _image_info.popitem(last=False)
+    return info
+
+
+def get_image_pixels(filename, mode=None):
+    """Returns the decoded pixels of an image file as a numpy array, optionally
+    converted to a PIL image mode.  Decoded images are cached and the least
+    recently used are evicted once IMAGE_PIXEL_CACHE_BYTES is exceeded.  The
+    returned array is shared with the cache and must not be modified."""
+    key = _image_key(filename)
+    if key is None:
+        return None
+    key = key + (mode,)
+    if key in _image_pixels:
+        _image_pixels.move_to_end(key)
+        return _image_pixels[key]
+    with Image.open(filename) as im:
+        if mode is not None and not im.mode == mode:
+            im = im.convert(mode)
+        pixels = np.asarray(im)
+    pixels.flags.writeable = False
+    if pixels.nbytes <= IMAGE_PIXEL_CACHE_BYTES:
+        _image_pixels[key] = pixels
+        total = sum(v.nbytes for v in _image_pixels.values())
+        while total > IMAGE_PIXEL_CACHE_BYTES:
+            _, evicted = _image_pixels.popitem(last=False)
+            total -= evicted.nbytes
+    return pixels
+
+
+def get_resampled_image(filename, size):
+    """Returns a reportlab ImageReader of an image file resampled to a size of
+    (width, height) pixels.  Resampled images are cached by file and size so
+    that repeated placements of an image share one resampled copy and the
+    image is decoded with get_image_pixels so that resampling it to other
+    sizes does not decode it again."""
+    key = _image_key(filename)
+    if key is None:
+        return None
+    key = key + (tuple(size),)
+    if key in _resampled_images:
+        _resampled_images.move_to_end(key)
+        return _resampled_images[key]
+    info = get_image_info(filename)
+    if info["has_alpha"]:
+        mode = "RGBA"
+    elif info["mode"] in ("1", "L"):
+        mode = "L"
+    else:
+        mode = "RGB"
+    pixels = get_image_pixels(filename, mode)
+    im = Image.fromarray(pixels).resize(tuple(size), Image.LANCZOS)
+    image = ImageReader(im)
+    _resampled_images[key] = image
+    while len(_resampled_images) > max(1, RESAMPLED_IMAGE_CACHE_SIZE):
+        _resampled_images.popitem(last=False)
+    return image
+
+
+def clear_image_cache():
+    _image_info.clear()
+    _image_pixels.clear()
+    _resampled_images.clear()
+
+
 def get_image_metrics(filename):
-    img_file = Path(filename)
-    if img_file.is_file():
-        im = Image.open(filename)
-        width, height = im.size
-        im.close()
-        return width, height
-    return (0, 0)
+    info = get_image_info(filename)
+    if info is None:
+        return (0, 0)
+    return info["width"], info["height"]
+
+
+# preset graphics files included in this package indexed by file extension
+_preset_files = {}
+
+
+def _preset_index(ext):
+    ext = ext.lower()
+    if ext not in _preset_files:
+        fp = os.path.abspath(os.path.dirname(__file__) + os.sep + "graphics")
+        files = FileOps().get_file_list(fp, "*" + ext, recursive=True)
+        presets = sorted(str(f) for f in files if str(f).lower().endswith(ext))
+        index = {}
+        for preset in presets:
+            index.setdefault(os.path.basename(preset), preset)
+        _preset_files[ext] = presets, index
+    return _preset_files[ext]
+
+
+def get_preset_files(ext):
+    """Returns a sorted list of the preset graphic files with extension ext
+    included in this package.  The graphics folder is only searched once."""
+    return list(_preset_index(ext)[0])
+
+
+def find_preset_file(name, ext):
+    """Returns the path of a named preset graphic file with extension ext or
+    None if there is no such preset."""
+    if not name.endswith(ext):
+        name = name + ext
+    return _preset_index(ext)[1].get(name, None)
+
+
+def get_file_mtime(filename):
+    """Returns the modification time of a file or None if it does not exist."""
+    try:
+        return Path(filename).stat().st_mtime
+    except (OSError, TypeError, ValueError):
+        return None
 
 
 def does_string_fit(canvas, s, fontname, fontsize, width):
@@ -461,23 +778,64 @@ def get_edge_colours(fn, pageno, scale=1.0, pix_scale=2.0):
     return edge_dict
 
 
+# image alpha tables cached by get_alpha_table within a memory budget
+ALPHA_TABLE_CACHE_BYTES = 64 * 1024 * 1024
+_alpha_tables = OrderedDict()
+
+
+def get_alpha_table(fn):
+    """Returns a summed-area table of the non-transparent pixels in an image.
+    Tables are cached by filename, modification time and size and the least
+    recently used tables are evicted once ALPHA_TABLE_CACHE_BYTES is exceeded."""
+    key = _image_key(fn)
+    if key is None:
+        raise FileNotFoundError(fn)
+    if key in _alpha_tables:
+        _alpha_tables.move_to_end(key)
+        return _alpha_tables[key]
+    # only the table is kept, the decoded pixels are not added to the
+    # image pixel cache
+    with Image.open(fn) as im:
+        alpha = np.asarray(im.convert("RGBA").getchannel("A"))
+    height, width = alpha.shape
+    # a count of pixels only needs 64 bits for images over 2**31 pixels
+    dtype = np.int32 if height * width < 2**31 else np.int64
+    table = np.zeros((height + 1, width + 1), dtype=dtype)
+    np.cumsum(alpha != 0, axis=0, dtype=dtype, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+    if table.nbytes <= ALPHA_TABLE_CACHE_BYTES:
+        _alpha_tables[key] = table
+        total = sum(v.nbytes for v in _alpha_tables.values())
+        while total > ALPHA_TABLE_CACHE_BYTES:
+            _, evicted = _alpha_tables.popitem(last=False)
+            total -= evicted.nbytes
+    return table
+
+
+def clear_alpha_table_cache():
+    _alpha_tables.clear()
+
+
 def is_rect_in_transparent_region(fn, rect):
     """Determines if a rect area overlaps only transparent pixels in an image"""
-    im = Image.open(fn)
-    im = im.convert("RGBA")
-    pix = im.load()
-    width, height = im.size
+    info = get_image_info(fn)
+    if info is None:
+        raise FileNotFoundError(fn)
+    height, width = info["height"], info["width"]
     # intersect the rectangle within the bounds of the image
     rb, rt = int(rect.bottom), int(rect.top)
     y0, y1 = min(rb, rt), max(rb, rt)
     x0, x1 = int(rect.left), int(rect.right)
     x0, x1 = clamp_value(x0, 0, width), clamp_value(x1, 0, width)
     y0, y1 = clamp_value(y0, 0, height), clamp_value(y1, 0, height)
-    for y in range(y0, y1):
-        for x in range(x0, x1):
-            if not pix[x, y][3] == 0:
-                return False
-    return True
+    if x1 <= x0 or y1 <= y0:
+        return True
+    # images without an alpha channel are opaque everywhere
+    if not info["has_alpha"]:
+        return False
+    table = get_alpha_table(fn)
+    opaque = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+    return bool(opaque == 0)
 
 
 def modify_pdf_file(
@@ -598,3 +956,44 @@ def linear_offset(length, width, thickness):
     th = math.atan2(width, length)
     rx = thickness / math.sin(th)
     return math.sqrt(rx * rx - thickness * thickness)
+
+
+def simplify_polyline(coords, tolerance):
+    """Simplifies a polyline so that no discarded point deviates from the
+    result by more than about tolerance.  Runs of points falling within the
+    same tolerance sized cell are first decimated and the remainder is reduced
+    with the Douglas-Peucker algorithm.  A tolerance of 72 / dpi points
+    corresponds to one device pixel.  Returns an N x 2 numpy array."""
+    pts = np.asarray(coords, dtype=float).reshape(-1, 2)
+    if len(pts) < 3 or tolerance is None or not tolerance > 0:
+        return pts
+    cells = np.floor(pts / tolerance)
+    keep = np.ones(len(pts), dtype=bool)
+    keep[1:] = np.any(cells[1:] != cells[:-1], axis=1)
+    keep[-1] = True
+    pts = pts[keep]
+    n = len(pts)
+    if n < 3:
+        return pts
+    keep = np.zeros(n, dtype=bool)
+    keep[0], keep[-1] = True, True
+    spans = [(0, n - 1)]
+    while spans:
+        i0, i1 = spans.pop()
+        if i1 - i0 < 2:
+            continue
+        p0 = pts[i0]
+        dx, dy = pts[i1] - p0
+        rel = pts[i0 + 1 : i1] - p0
+        length = math.hypot(dx, dy)
+        if length > 0:
+            dist = np.abs(rel[:, 0] * dy - rel[:, 1] * dx) / length
+        else:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        idx = int(np.argmax(dist))
+        if dist[idx] > tolerance:
+            im = i0 + 1 + idx
+            keep[im] = True
+            spans.append((i0, im))
+            spans.append((im, i1))
+    return pts[keep]
@@ -38,7 +38,7 @@ class LabelDoc:
     which supports a draw_in_canvas method, i.e. any ContentRect dervied class
     or TableVector derived class."""
 
-    def __init__(self, filename, style=None):
+    def __init__(self, filename, style=None, dry_run=False):
         self.filename = filename
         self.style = DocStyle()
         self.style.set_with_dict(style)
@@ -47,6 +47,12 @@ class LabelDoc:
         self.c = None
         self.page_number = 1
         self.cell_ptr = None
+        # layout-only label generation without PDF output
+        self.dry_run = dry_run
+        # default resolution for embedded images, None embeds at full resolution
+        self.embed_dpi = None
+        self.label_count = 0
+        self.canvas_report = None
 
     def __str__(self):
         rs = []
@@ -209,10 +215,13 @@ class LabelDoc:
     def _doc_start(self):
         """Called by iter_label automatically at document start"""
         self.compute_page_metrics()
-        self.c = canvas.Canvas(
-            self.filename,
-            pagesize=(self.style["width"], self.style["height"]),
-        )
+        pagesize = (self.style["width"], self.style["height"])
+        if self.dry_run:
+            self.c = NullCanvas(self.filename, pagesize=pagesize)
+        else:
+            self.c = canvas.Canvas(self.filename, pagesize=pagesize)
+        self.c = StateCanvas(self.c)
+        set_canvas_image_dpi(self.c, self.embed_dpi)
         self.c.saveState()
         self.page_number = 1
 
@@ -229,6 +238,21 @@ class LabelDoc:
         """Called by iter_label automatically at the end of label document"""
         self.c.showPage()
         self.c.save()
+        if is_dry_run(self.c):
+            self.canvas_report = self.c.report()
+
+    def layout_report(self):
+        """Returns a dictionary summary of the most recently generated label
+        sheets.  Canvas operation counts are included for dry-run documents."""
+        report = {
+            "pages": self.page_number,
+            "labels": self.label_count,
+            "labels_per_page": self.labels_per_page,
+            "dry_run": self.dry_run,
+        }
+        if self.canvas_report is not None:
+            report["canvas"] = self.canvas_report
+        return report
 
     def iter_label(self, labels):
         """Generator which makes the labels based on provided item list.
@@ -249,6 +273,7 @@ class LabelDoc:
             self.cell_ptr = (row, col)
             yield label, row, col
             idx += 1
+            self.label_count = idx
             if idx == len(labels):
                 self.tablegrid.draw_in_canvas(self.c)
                 self._doc_end()
@@ -0,0 +1,217 @@
+#! /usr/bin/env python3
+#
+# Copyright (C) 2020  Michael Gale
+
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Opt-in profiler which records a timing tree of layout and drawing calls
+
+import functools
+import json
+import time
+
+from pdfdoc import *
+
+# methods which are timed for each content and container object
+PROFILED_METHODS = (
+    "get_content_size",
+    "compute_cell_sizes",
+    "layout_cells",
+    "draw_in_canvas",
+)
+
+
+def _subclasses(cls):
+    classes = [cls]
+    for sub in cls.__subclasses__():
+        classes.extend(_subclasses(sub))
+    return classes
+
+
+class ProfileNode:
+    """A node of a LayoutProfiler timing tree.  Each node describes the calls
+    of one method of one object within the same parent call."""
+
+    def __init__(self, label, method, obj_id=None):
+        self.label = label
+        self.method = method
+        self.obj_id = obj_id
+        self.calls = 0
+        self.inclusive = 0.0
+        self.children = {}
+
+    def __repr__(self):
+        return "%s(%s.%s, calls=%d, inclusive=%.6f)" % (
+            self.__class__.__name__,
+            self.label,
+            self.method,
+            self.calls,
+            self.inclusive,
+        )
+
+    @property
+    def name(self):
+        return "%s.%s" % (self.label, self.method) if self.method else self.label
+
+    @property
+    def exclusive(self):
+        """Time spent in this node excluding the time spent in its children."""
+        return max(
+            0.0, self.inclusive - sum(c.inclusive for c in self.children.values())
+        )
+
+    def iter_nodes(self, depth=0):
+        yield self, depth
+        for child in self.children.values():
+            yield from child.iter_nodes(depth + 1)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "inclusive": self.inclusive,
+            "exclusive": self.exclusive,
+            "children": [child.to_dict() for child in self.children.values()],
+        }
+
+
+class LayoutProfiler:
+    """Records how many times get_content_size, compute_cell_sizes, layout_cells
+    and draw_in_canvas are called for every ContentRect, TableVector and
+    TextTable object and how long each call took.  Profiling is enabled by
+    using the profiler as a context manager, e.g.
+
+        with LayoutProfiler() as profiler:
+            table.draw_in_canvas(c)
+        print(profiler)
+
+    The methods of every content and container class are only instrumented
+    while the profiler is active.  The result is a tree of ProfileNode objects
+    which can be printed, exported as JSON or as folded stacks for flame
+    graph tools."""
+
+    _active = None
+
+    def __init__(self, methods=None):
+        self.methods = methods if methods is not None else PROFILED_METHODS
+        self.root = ProfileNode("profile", None)
+        self._stack = [self.root]
+        self._patched = []
+        self._start = None
+
+    def __enter__(self):
+        if LayoutProfiler._active is not None:
+            raise RuntimeError("A LayoutProfiler is already active")
+        LayoutProfiler._active = self
+        classes = []
+        for cls in (ContentRect, TableVector, TextTable):
+            classes.extend(_subclasses(cls))
+        for cls in dict.fromkeys(classes):
+            for method in self.methods:
+                func = cls.__dict__.get(method, None)
+                if callable(func):
+                    self._patched.append((cls, method, func))
+                    setattr(cls, method, self._wrap(func, method))
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.root.inclusive += time.perf_counter() - self._start
+        for cls, method, func in reversed(self._patched):
+            setattr(cls, method, func)
+        self._patched = []
+        LayoutProfiler._active = None
+        return False
+
+    def _wrap(self, func, method):
+        @functools.wraps(func)
+        def wrapper(obj, *args, **kwargs):
+            return self._call(func, method, obj, args, kwargs)
+
+        return wrapper
+
+    def _call(self, func, method, obj, args, kwargs):
+        parent = self._stack[-1]
+        # a call to an overridden method with super() is part of the same call
+        if parent.obj_id == id(obj) and parent.method == method:
+            return func(obj, *args, **kwargs)
+        key = (id(obj), method)
+        node = parent.children.get(key, None)
+        if node is None:
+            node = ProfileNode(repr(obj), method, id(obj))
+            parent.children[key] = node
+        node.calls += 1
+        self._stack.append(node)
+        t0 = time.perf_counter()
+        try:
+            return func(obj, *args, **kwargs)
+        finally:
+            node.inclusive += time.perf_counter() - t0
+            self._stack.pop()
+
+    def __str__(self):
+        return self.report()
+
+    def report(self, min_time=0.0):
+        """Returns a printable timing tree.  Nodes with an inclusive time less
+        than min_time seconds are omitted."""
+        s = []
+        s.append("%-60s %6s %10s %10s" % ("Call", "Calls", "Incl ms", "Excl ms"))
+        for node, depth in self.root.iter_nodes():
+            if depth > 0 and node.inclusive < min_time:
+                continue
+            s.append(
+                "%-60s %6d %10.3f %10.3f"
+                % (
+                    "  " * depth + node.name,
+                    node.calls,
+                    node.inclusive * 1000.0,
+                    node.exclusive * 1000.0,
+                )
+            )
+        return "\n".join(s)
+
+    def to_dict(self):
+        return self.root.to_dict()
+
+    def to_json(self, filename=None):
+        """Returns the timing tree as JSON and optionally writes it to filename."""
+        s = json.dumps(self.to_dict(), indent=2)
+        if filename is not None:
+            with open(filename, "w") as f:
+                f.write(s)
+        return s
+
+    def folded_stacks(self):
+        """Returns the timing tree in the folded stack format used by flame graph
+        tools (e.g. flamegraph.pl or speedscope).  Each line is a semicolon
+        separated call stack followed by its exclusive time in microseconds."""
+        lines = []
+
+        def fold(node, path):
+            path = path + [node.name.replace(";", ",").replace(" ", "")]
+            us = int(round(node.exclusive * 1e6))
+            if us > 0:
+                lines.append("%s %d" % (";".join(path), us))
+            for child in node.children.values():
+                fold(child, path)
+
+        fold(self.root, [])
+        return "\n".join(lines)
@@ -0,0 +1,116 @@
+#! /usr/bin/env python3
+#
+# Copyright (C) 2020  Michael Gale
+
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Layout state (dirty flag) tracking for content and container objects
+
+# attributes which describe geometry or are outputs of a layout pass.
+# Changing these does not invalidate a previously computed layout since
+# geometry is checked separately when a cached layout is reused.
+LAYOUT_NEUTRAL_ATTRS = (
+    "rect",
+    "rect_snapshot",
+    "size",
+    "width",
+    "height",
+    "top_left",
+    "top_right",
+    "bottom_left",
+    "bottom_right",
+    "centre",
+    "left",
+    "right",
+    "top",
+    "bottom",
+    "show_debug_rects",
+    "total_width",
+    "total_height",
+    "cell_order",
+    "gutters",
+    "first_row",
+    "is_static",
+)
+
+_SCALAR_TYPES = (str, int, float, bool, tuple, type(None))
+
+
+def same_value(v0, v1):
+    """Conservatively determines if two attribute values are the same.  Only
+    simple scalar values are compared, anything else is assumed to differ."""
+    if v0 is v1:
+        return True
+    if isinstance(v0, _SCALAR_TYPES) and isinstance(v1, _SCALAR_TYPES):
+        try:
+            return bool(v0 == v1)
+        except Exception:
+            return False
+    return False
+
+
+def rect_geometry(rect):
+    """Returns a hashable tuple describing the position and size of a rect."""
+    return rect.left, rect.top, rect.right, rect.bottom
+
+
+class LayoutStateMixin:
+    """Convenience class which adds a layout dirty flag to content and container
+    classes.  The flag is set whenever a layout affecting attribute, style or
+    content changes and is propagated to every ancestor container so that
+    layout passes can re-use cached results for clean subtrees."""
+
+    def __setattr__(self, key, value):
+        old = self.__dict__.get(key, None)
+        super().__setattr__(key, value)
+        if key.startswith("_") or key in LAYOUT_NEUTRAL_ATTRS:
+            return
+        if key == "style":
+            if hasattr(type(value), "add_owner"):
+                value.add_owner(self)
+        elif key in ("content", "overlay_content"):
+            if isinstance(value, LayoutStateMixin):
+                value.set_layout_parent(self)
+        if not same_value(old, value):
+            self.mark_dirty()
+
+    @property
+    def is_dirty(self):
+        return self.__dict__.get("_dirty", True)
+
+    @property
+    def layout_parent(self):
+        return self.__dict__.get("_layout_parent", None)
+
+    def set_layout_parent(self, parent):
+        self.__dict__["_layout_parent"] = parent
+        if parent is not None:
+            parent.mark_dirty()
+
+    def mark_dirty(self):
+        """Flags this object and all of its ancestors as requiring a new layout."""
+        obj = self
+        while obj is not None:
+            obj.__dict__["_dirty"] = True
+            obj.__dict__["_size_cache"] = None
+            obj = obj.__dict__.get("_layout_parent", None)
+
+    def mark_clean(self):
+        self.__dict__["_dirty"] = False
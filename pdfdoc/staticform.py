@@ -0,0 +1,115 @@
+#! /usr/bin/env python3
+#
+# Copyright (C) 2020  Michael Gale
+
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Form XObject caching of static content and container objects
+
+import functools
+
+from reportlab.lib.rl_accel import fp_str
+from reportlab.pdfbase.pdfdoc import PDFResourceDictionary
+
+from pdfdoc.helpers import is_dry_run, is_culled
+
+
+def static_content(draw):
+    """Decorates the draw_in_canvas method of a content or container class so
+    that objects with is_static set are drawn into a form XObject once per
+    document.  Later draws of an object with the same fingerprint and size only
+    place the form with a single Do operator, skipping layout and drawing."""
+
+    @functools.wraps(draw)
+    def draw_in_canvas(self, c, *args, **kwargs):
+        if (
+            not getattr(self, "is_static", False)
+            or self.__dict__.get("_drawing_static", False)
+            or is_dry_run(c)
+        ):
+            return draw(self, c, *args, **kwargs)
+        return draw_static_form(self, c, draw, *args, **kwargs)
+
+    return draw_in_canvas
+
+
+def _form_resources(c):
+    """Returns a resource dictionary for a form being drawn on canvas c.
+    reportlab only assigns fonts and XObjects to forms, so graphics states,
+    colour spaces and shadings used by the form are added here."""
+    resources = PDFResourceDictionary()
+    resources.basicFonts()
+    resources.allProcs()
+    if c._formsinuse:
+        resources.XObject = c._doc.xobjDict(c._formsinuse)
+    ext_gstate = c._extgstate.getState()
+    if ext_gstate is not None:
+        resources.ExtGState = ext_gstate
+    resources.setColorSpace(c._colorsUsed)
+    resources.setShading(c._shadingUsed)
+    return resources
+
+
+def draw_static_form(obj, c, draw, *args, **kwargs):
+    """Draws obj with its draw method as a form XObject which is cached in the
+    document of canvas c by the draw fingerprint and size of obj."""
+    from pdfdoc.tablecell.layoutsnapshot import draw_fingerprint
+
+    if is_culled(c, obj.rect):
+        return None
+    left, top = obj.rect.left, obj.rect.top
+    key = (
+        obj.__class__.__name__,
+        draw_fingerprint(obj),
+        fp_str(obj.rect.width, obj.rect.height),
+        repr(args),
+        repr(sorted(kwargs.items())),
+    )
+    doc = c._doc
+    if getattr(doc, "_pdfdoc_static_forms", None) is None:
+        doc._pdfdoc_static_forms = {}
+        doc._pdfdoc_static_count = 0
+    forms = doc._pdfdoc_static_forms
+    result = None
+    if key not in forms:
+        # the name is reserved before drawing since static children drawn
+        # inside this form define their own forms before this one is complete
+        name = "pdfdoc_static_%d" % (doc._pdfdoc_static_count)
+        doc._pdfdoc_static_count += 1
+        # the form is drawn in page coordinates at the position of the first
+        # object and is not limited by a viewport since it is re-used elsewhere
+        pw, ph = c._pagesize
+        viewport = getattr(c, "_pdfdoc_viewport", None)
+        c._pdfdoc_viewport = None
+        c.beginForm(name, -pw, -ph, 2 * pw, 2 * ph)
+        obj.__dict__["_drawing_static"] = True
+        try:
+            result = draw(obj, c, *args, **kwargs)
+        finally:
+            obj.__dict__["_drawing_static"] = False
+            c._pdfdoc_viewport = viewport
+        c.endForm(Resources=_form_resources(c))
+        forms[key] = (name, left, top)
+    name, x0, y0 = forms[key]
+    c.saveState()
+    c.translate(left - x0, top - y0)
+    c.doForm(name)
+    c.restoreState()
+    return result
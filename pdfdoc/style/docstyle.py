@@ -26,11 +26,13 @@
 import copy
 from collections import OrderedDict
 import string
+import weakref
 from reportlab.lib.units import mm
 import yaml
 
 from toolbox import Params, Rect
 from pdfdoc import *
+from pdfdoc.layoutstate import same_value
 
 attr_aliases = {
     "title-color": "title-colour",
@@ -53,6 +55,9 @@ attr_aliases = {
     "dash": "line-dash",
 }
 
+# normalized attribute names shared by every DocStyle instance
+_attr_names = {}
+
 
 class DocStyle:
     """Container class for storing style information using CSS-like tag/attributes.
@@ -61,7 +66,12 @@ class DocStyle:
     use of "colour" and "color"), and computation of derived values from the
     style such as page dimensions with or without margins/padding etc."""
 
+    # attribute keys which can change the layout of an owning object
+    _layout_keys = None
+
     def __init__(self, style=None, **kwargs):
+        self.__dict__["_version"] = 0
+        self.__dict__["_owners"] = []
         self.__dict__["attr"] = {
             "length": 0,
             "width": 0,
@@ -130,6 +140,13 @@ class DocStyle:
             "rotated-bounds": True,
             "split-lines": False,
         }
+        if DocStyle._layout_keys is None:
+            # geometry is tracked by the owning object's rect
+            DocStyle._layout_keys = frozenset(self.attr) - {
+                "length",
+                "width",
+                "height",
+            }
         if style is not None:
             self.set_with_dict(style)
         for k, v in kwargs.items():
@@ -223,8 +240,10 @@ class DocStyle:
         self.attr[attr_name] = attr_value
 
     def _attr_key(self, key):
-        attr_name = key.replace("_", "-")
-        attr_name = attr_name.lower()
+        attr_name = _attr_names.get(key, None)
+        if attr_name is None:
+            attr_name = key.replace("_", "-").lower()
+            _attr_names[key] = attr_name
         if attr_name in attr_aliases:
             alias = attr_aliases[attr_name]
             if alias in self.attr:
@@ -233,8 +252,33 @@ class DocStyle:
 
     def set_attr(self, attr_key, attr_value):
         key = self._attr_key(attr_key)
+        old_value = self.attr.get(key, None)
         if not self._set_colour_attr(key, attr_value):
             self.attr[key] = attr_value
+        if key in self._layout_keys and not same_value(old_value, self.attr[key]):
+            self.touch()
+
+    @property
+    def version(self):
+        """A counter which increments each time a layout attribute changes."""
+        return self._version
+
+    def add_owner(self, owner):
+        """Registers an object which should be flagged for a new layout whenever
+        this style changes."""
+        if any(ref() is owner for ref in self._owners):
+            return
+        self._owners.append(weakref.ref(owner))
+
+    def touch(self):
+        self.__dict__["_version"] += 1
+        owners = []
+        for ref in self._owners:
+            owner = ref()
+            if owner is not None:
+                owner.mark_dirty()
+                owners.append(ref)
+        self.__dict__["_owners"] = owners
 
     def get_attr(self, attr_key, def_value=None):
         key = self._attr_key(attr_key)
@@ -273,7 +317,7 @@ class DocStyle:
         # not in attr, but in __dict__ then override with those
         if isinstance(style_dict, DocStyle):
             for k, v in style_dict.__dict__.items():
-                if not k == "attr":
+                if not k == "attr" and not k.startswith("_"):
                     key = self._attr_key(k)
                     self.set_attr(key, v)
 
@@ -684,7 +728,11 @@ def roman_number(num):
 
 
 class DocStyleMixin:
-    """Convenience class to add style semantics to another class."""
+    """Convenience class to add style semantics to another class.  Attributes
+    of the object which are also style attributes (e.g. font_size or
+    split_lines) are mirrored into its style when they are set, and style
+    attributes can be read as attributes of the object.  Other object
+    attributes (e.g. text or rect) are not copied into style.attr."""
 
     def __getattr__(self, key):
         if "style" in self.__dict__:
@@ -695,7 +743,11 @@ class DocStyleMixin:
 
     def __setattr__(self, key, value):
         if "style" in self.__dict__:
-            self.style.set_attr(key, value)
+            # only attributes which are style attributes are mirrored into
+            # the style, so that styles don't accumulate object attributes
+            # (no style lookups refer to object attributes)
+            if self.style._attr_key(key) in self.style.attr:
+                self.style.set_attr(key, value)
         elif key in dir(self):
             setattr(self, key, value)
         super().__setattr__(key, value)
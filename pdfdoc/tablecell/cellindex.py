@@ -0,0 +1,107 @@
+#! /usr/bin/env python3
+#
+# Copyright (C) 2020  Michael Gale
+
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Uniform grid spatial index over the rects of container cells
+
+import math
+
+
+class CellIndex:
+    """A uniform grid spatial index over a list of (item, rect) pairs.  The grid
+    pitch is the mean size of the indexed rects so that each rect typically
+    occupies only a few bins and overlap queries only compare near neighbours."""
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.bins = {}
+        self.pitch_x, self.pitch_y = 1.0, 1.0
+        if not self.items:
+            return
+        n = len(self.items)
+        mean_w = sum(r.width for _, r in self.items) / n
+        mean_h = sum(r.height for _, r in self.items) / n
+        self.pitch_x = mean_w if mean_w > 0 else 1.0
+        self.pitch_y = mean_h if mean_h > 0 else 1.0
+        self.spans = []
+        for idx, (_, rect) in enumerate(self.items):
+            span = self._span(rect)
+            self.spans.append(span)
+            x0, y0, x1, y1 = span
+            for ix in range(x0, x1 + 1):
+                for iy in range(y0, y1 + 1):
+                    self.bins.setdefault((ix, iy), []).append(idx)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _span(self, rect):
+        return (
+            math.floor(min(rect.left, rect.right) / self.pitch_x),
+            math.floor(min(rect.bottom, rect.top) / self.pitch_y),
+            math.floor(max(rect.left, rect.right) / self.pitch_x),
+            math.floor(max(rect.bottom, rect.top) / self.pitch_y),
+        )
+
+    def candidates(self, rect):
+        """Returns the indices of items which share a grid bin with rect."""
+        found = set()
+        if not self.items:
+            return found
+        x0, y0, x1, y1 = self._span(rect)
+        # a very large query rect is cheaper to test against every item
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.bins):
+            for ix, iy in self.bins:
+                if x0 <= ix <= x1 and y0 <= iy <= y1:
+                    found.update(self.bins[(ix, iy)])
+            return found
+        for ix in range(x0, x1 + 1):
+            for iy in range(y0, y1 + 1):
+                found.update(self.bins.get((ix, iy), ()))
+        return found
+
+    def overlaps_of(self, rect, exclude=None):
+        """Returns a list of items whose rects overlap rect."""
+        items = []
+        for idx in sorted(self.candidates(rect)):
+            item, other = self.items[idx]
+            if item is exclude:
+                continue
+            if rect.overlaps(other):
+                items.append(item)
+        return items
+
+    def overlapping_pairs(self):
+        """Generates each pair of items whose rects mutually overlap."""
+        seen = set()
+        for members in self.bins.values():
+            if len(members) < 2:
+                continue
+            for i, i0 in enumerate(members):
+                for i1 in members[i + 1 :]:
+                    pair = (i0, i1) if i0 < i1 else (i1, i0)
+                    if pair in seen:
+                        continue
+                    seen.add(pair)
+                    (item0, r0), (item1, r1) = self.items[pair[0]], self.items[pair[1]]
+                    if r0.overlaps(r1):
+                        yield item0, item1
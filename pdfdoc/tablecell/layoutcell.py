@@ -23,6 +23,11 @@
 #
 # LayoutCell class
 
+import heapq
+from functools import lru_cache
+
+import numpy as np
+
 from toolbox import *
 from pdfdoc import *
 
@@ -150,6 +155,75 @@ def parse_constraint(constraint):
     return cdict
 
 
+@lru_cache(maxsize=1024)
+def compile_constraint(constraint):
+    """Compiles a constraint string into a tuple describing a single layout step.
+    The first element of the tuple is the operation:
+        ("between", vert, horz, group1_labels, group2_labels)
+        ("anchor", dest_labels, anchor_constraint)
+        ("shove", dest_labels, shove_constraint)
+        ("horz_pos", offset) or ("vert_pos", offset)
+    dest_labels is None if the step refers to the parent container.  Compiled
+    constraints are cached so that each distinct constraint is parsed once."""
+    cd = parse_constraint(constraint)
+    for token in BETWEEN_TOKENS:
+        if token in cd:
+            vert = token in ("between", "between_vert")
+            horz = token in ("between", "between_horz")
+            g1, g2 = cd[token]["group1"], cd[token]["group2"]
+            return ("between", vert, horz, tuple(g1), tuple(g2))
+    if len(cd["dest_labels"]) > 0:
+        labels = tuple(cd["dest_labels"])
+        if cd["from_pt"] is not None:
+            return ("anchor", labels, cd["from_pt"] + " to " + cd["dest_pt"])
+        if "bound" in cd["dest_pt"].lower().split("_"):
+            return ("shove", labels, cd["dest_pt"])
+        return ("anchor", labels, cd["dest_pt"])
+    if "abs_pos" in cd:
+        return (cd["abs_pos"], float(cd["abs_val"][0]))
+    if cd["from_pt"] is not None:
+        return ("anchor", None, cd["from_pt"] + " to " + cd["dest_pt"])
+    return ("anchor", None, cd["dest_pt"])
+
+
+def compile_constraints(constraints):
+    """Returns a tuple of compiled steps for a list of constraint strings."""
+    if constraints is None:
+        return ()
+    return tuple(compile_constraint(c) for c in constraints)
+
+
+def step_labels(step):
+    """Returns the labels of other cells (or parent edges) referred to by a
+    compiled constraint step."""
+    if step[0] == "between":
+        return (*step[3], *step[4])
+    if step[0] in ("anchor", "shove") and step[1] is not None:
+        return step[1]
+    return ()
+
+
+def group_bounds(edges, groups):
+    """Returns the bounding edges (left, bottom, right, top) of groups of rows
+    in an array of rect edges.  Empty groups have NaN bounds."""
+    bounds = np.full((len(groups), 4), np.nan)
+    valid = [i for i, g in enumerate(groups) if len(g) > 0]
+    if not valid:
+        return bounds
+    rows = edges[np.concatenate([groups[i] for i in valid])]
+    starts = np.cumsum([0] + [len(groups[i]) for i in valid[:-1]])
+    bounds[valid, :2] = np.minimum.reduceat(rows[:, :2], starts, axis=0)
+    bounds[valid, 2:] = np.maximum.reduceat(rows[:, 2:], starts, axis=0)
+    return bounds
+
+
+def rect_from_bounds(bounds):
+    left, bottom, right, top = bounds
+    rect = Rect(right - left, top - bottom)
+    rect.move_top_left_to((left, top))
+    return rect
+
+
 def dummy_rect_from_parent_edge(parent_rect, edges):
     edges = edges.split("_")
     x, y = parent_rect.get_centre()
@@ -197,6 +271,9 @@ class LayoutCell(TableVector):
         super().__init__(w, h, style)
         self.width_constraint = w
         self.height_constraint = h
+        # "greedy" lays out cells once at the current container size,
+        # "linear" solves for the container size which the layout settles at
+        self.solver = "greedy"
         self.parse_kwargs(**kwargs)
 
     def __str__(self):
@@ -206,6 +283,7 @@ class LayoutCell(TableVector):
         s.append("  Rect: %s" % (str(self.rect)))
         s.append("  Overlay content: %r" % (self.overlay_content))
         s.append("  Show debug rects: %s" % (self.show_debug_rects))
+        s.append("  Solver: %s" % (self.solver))
         s.append(
             "  Width/height constraint: %.1f, %.1f"
             % (self.width_constraint, self.height_constraint)
@@ -229,128 +307,197 @@ class LayoutCell(TableVector):
         return "\n".join(s)
 
     def compute_cell_order(self):
-        """Reorder cells so that cells without sibling dependancies are first
-        followed by cells with mutual dependancies."""
-        peer_labels = []
-        for cell in self.cells:
-            if cell.constraints is None:
-                continue
-            elabels = []
-            for c in cell.constraints:
-                e = extract_labels(
-                    c, [*CONSTRAINT_TOKENS, *SINGLE_TOKENS, *OTHER_TOKENS]
-                )
-                elabels.extend(e)
-            peer_labels.append([cell.label, elabels])
-        pn = len(peer_labels)
-        for i in range(0, pn - 1):
-            for j in range(i + 1, pn):
-                if peer_labels[j][0] in peer_labels[i][1]:
-                    peer_labels[i], peer_labels[j] = peer_labels[j], peer_labels[i]
-        self.cell_order = []
-        for i, cell in enumerate(peer_labels):
-            self.cell_order.append(cell[0])
-            self.set_cell_order(cell[0], i)
+        """Reorder cells so that every cell is placed after the sibling cells
+        referred to by its constraints.  Cells are otherwise kept in the order
+        they were added.  A ValueError is raised if the constraints have a
+        circular dependency."""
+        cells = [cell for cell in self.cells if cell.constraints is not None]
+        key = [(cell.label, tuple(cell.constraints)) for cell in cells]
+        plan = self.__dict__.get("_layout_plan", None)
+        if plan is None or not plan[0] == key:
+            plan = (key, *self._sorted_cell_labels(cells))
+            self.__dict__["_layout_plan"] = plan
+        self.cell_order = list(plan[1])
+        for i, label in enumerate(self.cell_order):
+            self.set_cell_order(label, i)
 
-    def layout_cells(self):
-        def _collect_rects(cells, parent_rect):
-            rects = []
-            for cell in cells:
-                if self.is_cell_visible(cell):
-                    rects.append(self.get_cell_rect(cell))
-                else:
-                    pr = dummy_rect_from_parent_edge(parent_rect, cell)
-                    if pr is not None:
-                        rects.append(pr)
-            return rects
+    @staticmethod
+    def _sorted_cell_labels(cells):
+        """Topologically sorts cells by the dependencies of their constraints.
+        Returns the sorted labels and the labels grouped by dependency level,
+        i.e. cells which only depend on cells in preceding levels."""
+        indices = {}
+        for i, cell in enumerate(cells):
+            indices.setdefault(cell.label, []).append(i)
+        deps = []
+        for i, cell in enumerate(cells):
+            dep = set()
+            for step in compile_constraints(cell.constraints):
+                for label in step_labels(step):
+                    dep.update(j for j in indices.get(label, ()) if j != i)
+            deps.append(dep)
+        dependents = [[] for _ in cells]
+        for i, dep in enumerate(deps):
+            for j in dep:
+                dependents[j].append(i)
+        pending = [len(dep) for dep in deps]
+        ready = [i for i, n in enumerate(pending) if n == 0]
+        heapq.heapify(ready)
+        order = []
+        levels = [0] * len(cells)
+        while ready:
+            i = heapq.heappop(ready)
+            order.append(i)
+            levels[i] = 1 + max((levels[j] for j in deps[i]), default=-1)
+            for j in dependents[i]:
+                pending[j] -= 1
+                if pending[j] == 0:
+                    heapq.heappush(ready, j)
+        if len(order) < len(cells):
+            # walk the remaining dependencies until a cell repeats
+            i = next(i for i, n in enumerate(pending) if n > 0)
+            path = []
+            while i not in path:
+                path.append(i)
+                i = min(j for j in deps[i] if pending[j] > 0)
+            cycle = path[path.index(i) :] + [i]
+            raise ValueError(
+                "LayoutCell constraints have a circular dependency: %s"
+                % (" -> ".join(cells[j].label for j in cycle))
+            )
+        grouped = [[] for _ in range(max(levels, default=-1) + 1)]
+        for i in order:
+            grouped[levels[i]].append(cells[i].label)
+        return [cells[i].label for i in order], grouped
 
+    def layout_cells(self):
+        """Places cells by executing their compiled constraints.  Cells are
+        processed one dependency level at a time and the edges of every rect
+        referred to by the cells in a level are kept in a NumPy array so that
+        the bounding rects and between positions of a whole level are resolved
+        in batched operations.  Anchor and shove steps are then applied with
+        the Rect methods which define them."""
         w = self.fixed_rect.width if self.is_fixed_width else self.rect.width
         h = self.fixed_rect.height if self.is_fixed_height else self.rect.height
         self.rect.set_size_anchored(w, h, anchor_pt="top left")
         prect = self.style.get_inset_rect(self.rect)
-        for cell in self.iter_cells():
-            crect = self.get_cell_rect(cell.label)
-            if cell.constraints is None:
-                # default to top left of parent container if no constraints are specified
-                crect = self.get_cell_rect(cell.label)
-                crect.anchor_with_constraint(prect, "top left to top left")
-                self.set_cell_rect(cell.label, crect)
-                continue
-            for c in cell.constraints:
-                cd = parse_constraint(c)
-                if any([token in cd for token in BETWEEN_TOKENS]):
-                    bt = "between" if "between" in cd else ""
-                    bt = "between_horz" if "between_horz" in cd else bt
-                    bt = "between_vert" if "between_vert" in cd else bt
-                    g1r = _collect_rects(cd[bt]["group1"], prect)
-                    g2r = _collect_rects(cd[bt]["group2"], prect)
-                    if len(g1r) > 0 and len(g2r) > 0:
-                        g1_rect = Rect.bounding_rect_from_rects(g1r)
-                        g2_rect = Rect.bounding_rect_from_rects(g2r)
-                        if "between_vert" in cd or "between" in cd:
-                            if g1_rect.bottom > g2_rect.top:
-                                mid_y = g2_rect.top + (g1_rect.bottom - g2_rect.top) / 2
-                            else:
-                                mid_y = g1_rect.top + (g2_rect.bottom - g1_rect.top) / 2
+        self.compute_cell_order()
+        cells, by_label = {}, {}
+        for cell in self.cells:
+            cells.setdefault(cell.label, cell)
+            by_label.setdefault(cell.label, []).append(cell)
+        levels = []
+        for labels in self.__dict__["_layout_plan"][2]:
+            items = []
+            for label in labels:
+                for cell in by_label.get(label, ()):
+                    if cell.visible:
+                        items.append((cell, compile_constraints(cell.constraints)))
+            levels.append(items)
+
+        # assign a row of the edge array to each referenced cell or parent edge
+        rows, rects = {}, []
+        for items in levels:
+            for _, steps in items:
+                for step in steps:
+                    for label in step_labels(step):
+                        if label in rows:
+                            continue
+                        cell = cells.get(label, None)
+                        if cell is not None and cell.visible:
+                            rect = cell.content.rect
+                        else:
+                            rect = dummy_rect_from_parent_edge(prect, label)
+                        rows[label] = None if rect is None else len(rects)
+                        if rect is not None:
+                            rects.append(rect)
+        edges = np.array(
+            [(r.left, r.bottom, r.right, r.top) for r in rects], dtype=float
+        ).reshape((-1, 4))
+
+        def _group(labels):
+            return [rows[label] for label in labels if rows[label] is not None]
+
+        for items in levels:
+            # a label refers to the first cell added with it
+            level_rows = [
+                (rows[cell.label], cell.content.rect)
+                for cell, _ in items
+                if rows.get(cell.label, None) is not None and cells[cell.label] is cell
+            ]
+            for k in range(max((len(steps) for _, steps in items), default=0)):
+                # refresh the edges of cells in this level since a constraint
+                # may refer to the cell it belongs to
+                for row, r in level_rows:
+                    edges[row] = r.left, r.bottom, r.right, r.top
+                active = [(c.content.rect, st[k]) for c, st in items if k < len(st)]
+                between = [(r, st) for r, st in active if st[0] == "between"]
+                others = [(r, st) for r, st in active if not st[0] == "between"]
+                if between:
+                    g1 = group_bounds(edges, [_group(st[3]) for _, st in between])
+                    g2 = group_bounds(edges, [_group(st[4]) for _, st in between])
+                    mid_y = np.where(
+                        g1[:, 1] > g2[:, 3],
+                        g2[:, 3] + (g1[:, 1] - g2[:, 3]) / 2,
+                        g1[:, 3] + (g2[:, 1] - g1[:, 3]) / 2,
+                    )
+                    mid_x = np.where(
+                        g1[:, 2] < g2[:, 0],
+                        g1[:, 2] + (g2[:, 0] - g1[:, 2]) / 2,
+                        g2[:, 2] + (g1[:, 0] - g2[:, 2]) / 2,
+                    )
+                    valid = ~(np.isnan(g1[:, 0]) | np.isnan(g2[:, 0]))
+                    for i, (crect, step) in enumerate(between):
+                        if not valid[i]:
+                            continue
+                        if step[1]:
                             crx, cry = crect.get_centre()
-                            crect.move_to((crx, mid_y))
-                        if "between_horz" in cd or "between" in cd:
-                            if g1_rect.right < g2_rect.left:
-                                mid_x = (
-                                    g1_rect.right + (g2_rect.left - g1_rect.right) / 2
-                                )
-                            else:
-                                mid_x = (
-                                    g2_rect.right + (g1_rect.left - g2_rect.right) / 2
-                                )
+                            crect.move_to((crx, float(mid_y[i])))
+                        if step[2]:
                             crx, cry = crect.get_centre()
-                            crect.move_to((mid_x, cry))
-                elif len(cd["dest_labels"]) > 0:
-                    others = []
-                    for dest in cd["dest_labels"]:
-                        if self.is_cell_visible(dest):
-                            dest_rect = self.get_cell_rect(dest)
-                            others.append(dest_rect)
+                            crect.move_to((float(mid_x[i]), cry))
+                peers = [st for _, st in others if st[0] in ("anchor", "shove")]
+                peers = [st[1] for st in peers if st[1] is not None]
+                bounds = iter(group_bounds(edges, [_group(g) for g in peers]))
+                for crect, step in others:
+                    op = step[0]
+                    if op in ("anchor", "shove"):
+                        if step[1] is None:
+                            other_rect = prect
                         else:
-                            pr = dummy_rect_from_parent_edge(prect, dest)
-                            if pr is not None:
-                                others.append(pr)
-                    other_rect = Rect.bounding_rect_from_rects(others)
-                    if cd["from_pt"] is not None:
-                        crect.anchor_with_constraint(
-                            other_rect, cd["from_pt"] + " to " + cd["dest_pt"]
-                        )
-                    else:
-                        if "bound" in cd["dest_pt"].lower().split("_"):
-                            crect.shove_with_constraint(other_rect, cd["dest_pt"])
+                            b = next(bounds)
+                            if np.isnan(b[0]):
+                                other_rect = Rect.bounding_rect_from_rects([])
+                            else:
+                                other_rect = rect_from_bounds(b)
+                        if op == "shove":
+                            crect.shove_with_constraint(other_rect, step[2])
                         else:
-                            crect.anchor_with_constraint(other_rect, cd["dest_pt"])
-                elif "abs_pos" in cd:
-                    if cd["abs_pos"] == "horz_pos":
+                            crect.anchor_with_constraint(other_rect, step[2])
+                    elif op == "horz_pos":
                         rect_mid = crect.get_centre()
-                        horz_pos = float(cd["abs_val"][0]) + prect.left
-                        crect.move_to(horz_pos, rect_mid[1])
-                    elif cd["abs_pos"] == "vert_pos":
+                        crect.move_to(step[1] + prect.left, rect_mid[1])
+                    elif op == "vert_pos":
                         rect_mid = crect.get_centre()
-                        vert_pos = prect.top - float(cd["abs_val"][0])
-                        crect.move_to(rect_mid[0], vert_pos)
-                else:
-                    if cd["from_pt"] is not None:
-                        crect.anchor_with_constraint(
-                            prect, cd["from_pt"] + " to " + cd["dest_pt"]
-                        )
-                    else:
-                        crect.anchor_with_constraint(prect, cd["dest_pt"])
-            self.set_cell_rect(cell.label, crect)
+                        crect.move_to(rect_mid[0], prect.top - step[1])
+            for row, r in level_rows:
+                edges[row] = r.left, r.bottom, r.right, r.top
 
     def add_cell(self, label, content, order=None, constraints=None):
         if order is not None:
             cell = TableCell(label, content, order, 0, 0)
         else:
             cell = TableCell(label, content, len(self.cells), 0, 0)
+        # constraints are compiled (and validated) once when they are added
+        compile_constraints(constraints)
         cell.constraints = constraints
+        cell.parent = self
         self.cells.append(cell)
 
+    def set_cell_constraints(self, label, constraints, order=None):
+        compile_constraints(constraints)
+        super().set_cell_constraints(label, constraints, order=order)
+
     def recompute_layout(self, with_padding=True):
         _, _ = self.get_content_size(with_padding=with_padding)
 
@@ -367,21 +514,77 @@ class LayoutCell(TableVector):
         return self.total_width, self.total_height
 
     def compute_cell_layout(self, with_padding=True):
+        # the layout depends on the starting size of this container
+        # since constraints can refer to the parent's edges
+        key = (with_padding, self.rect.width, self.rect.height)
+        if self.reuse_layout(key, size_is_output=True):
+            return
+        prev_sizes = self._cell_sizes()
         self.compute_cell_order()
         rpt = self.top_left
+        if self.solver == "linear":
+            size = self.solve_layout(with_padding=with_padding)
+        else:
+            size = self._layout_pass(self.rect.size, rpt, with_padding)
+        self.total_width, self.total_height = float(size[0]), float(size[1])
+        self.rect.set_size(self.total_width, self.total_height)
+        self.top_left = rpt
+        self.assign_cell_overlay_content_rects()
+        self._store_layout(key, prev_sizes)
+
+    def _layout_pass(self, size, rpt, with_padding=True):
+        """Lays out the cells with this container at size and returns the
+        size of the resulting content as an array."""
+        self.rect.set_size(*size)
+        self.top_left = rpt
         for cell in self.iter_cells():
             self.set_cell_rect(cell.label, Rect(*cell.content.get_content_size()))
         self.layout_cells()
         bounds = Rect.bounding_rect_from_rects(self.get_cell_rects(as_is=True))
-        self.total_width = bounds.width
-        self.total_height = bounds.height
+        size = np.array([bounds.width, bounds.height], dtype=float)
         if with_padding:
-            self.total_width += self.style.width_pad_margin
-            self.total_height += self.style.height_pad_margin
-        self.rect.set_size(self.total_width, self.total_height)
-        self.top_left = rpt
-        self.assign_cell_overlay_content_rects()
+            size += (self.style.width_pad_margin, self.style.height_pad_margin)
+        return size
+
+    def solve_layout(self, with_padding=True, max_iter=8, tol=1e-6):
+        """Solves for the container size at which the layout settles, i.e. the
+        size of the laid out content is the size the cells were laid out in.
+        Cells are moved relative to each other and to the container edges, so
+        horizontal positions only depend on the container width and vertical
+        positions only on its height.  Each content dimension is therefore a
+        piecewise affine function of the same container dimension.  Both slopes
+        are measured with one extra layout pass at a marginally larger size
+        (small enough to stay within the current piece) and the settled size
+        is solved directly rather than by repeatedly laying out.  The solution
+        is verified with one more pass and only refined if the layout crossed
+        into another piece, e.g. when a different cell became the outermost
+        one.  A settled layout takes 3 passes (1 if already settled) and at
+        most 1 + 2 * max_iter passes.  If there is no settled size, e.g. the
+        content grows as fast as the container or the solution is negative,
+        the layout at the starting size is kept as with the greedy solver.
+        Returns the settled size (or the content size of the greedy layout)."""
+        rpt = self.top_left
+        start = np.array(self.rect.size, dtype=float)
+        s0 = start
+        f0 = self._layout_pass(s0, rpt, with_padding)
+        for _ in range(max_iter):
+            if np.allclose(f0, s0, atol=tol):
+                return s0
+            ds = 1e-4 * np.maximum(1.0, np.abs(s0))
+            slope = (self._layout_pass(s0 + ds, rpt, with_padding) - f0) / ds
+            if np.any(np.abs(1.0 - slope) < 1e-9):
+                break
+            s1 = s0 + (f0 - s0) / (1.0 - slope)
+            if np.any(s1 < 0):
+                break
+            s0 = s1
+            f0 = self._layout_pass(s0, rpt, with_padding)
+        else:
+            if np.allclose(f0, s0, atol=tol):
+                return s0
+        return self._layout_pass(start, rpt, with_padding)
 
+    @static_content
     def draw_in_canvas(self, canvas):
         self.draw_cells_in_canvas(canvas)
 
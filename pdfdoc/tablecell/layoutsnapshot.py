@@ -0,0 +1,215 @@
+#! /usr/bin/env python3
+#
+# Copyright (C) 2020  Michael Gale
+
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Serializable snapshots of computed container layouts
+
+import hashlib
+import json
+
+from toolbox import *
+from pdfdoc import *
+from pdfdoc.layoutstate import LAYOUT_NEUTRAL_ATTRS, _SCALAR_TYPES, rect_geometry
+
+# attributes which are the content of a cell rather than its structure
+CONTENT_ATTRS = ("text", "filename", "qrtext")
+
+
+def _config_items(obj):
+    """Returns the layout relevant configuration attributes of an object."""
+    items = []
+    for k, v in sorted(obj.__dict__.items()):
+        if k.startswith("_") or k in LAYOUT_NEUTRAL_ATTRS or k in CONTENT_ATTRS:
+            continue
+        if isinstance(v, Rect):
+            items.append((k, v.width, v.height))
+        elif isinstance(v, _SCALAR_TYPES):
+            items.append((k, repr(v)))
+    return items
+
+
+def _style_items(style, all_keys=False):
+    if all_keys:
+        keys = style.attr.keys()
+    else:
+        keys = DocStyle._layout_keys if DocStyle._layout_keys is not None else ()
+    return [(k, repr(style.attr.get(k, None))) for k in sorted(keys)]
+
+
+def _content_items(obj):
+    items = []
+    for k in CONTENT_ATTRS:
+        if k in obj.__dict__:
+            items.append((k, repr(obj.__dict__[k])))
+    if obj.__dict__.get("filename", None):
+        items.append(("mtime", get_file_mtime(obj.filename)))
+    return items
+
+
+def _digest(items):
+    return hashlib.sha1(repr(items).encode("utf8")).hexdigest()
+
+
+def layout_fingerprints(obj, for_drawing=False):
+    """Returns a tuple of (structure fingerprint, content fingerprint) of an
+    object and all of its children.  The structure fingerprint describes the
+    object types, cell specifications, configuration and style.  The content
+    fingerprint describes the text, filenames etc. of the cell content.
+    If for_drawing is True, every style attribute (not only those which affect
+    layout) and any overlay content are included."""
+    structure = [obj.__class__.__name__, _config_items(obj)]
+    if getattr(obj, "style", None) is not None:
+        structure.append(_style_items(obj.style, all_keys=for_drawing))
+    content = _content_items(obj)
+    overlay = getattr(obj, "overlay_content", None)
+    if for_drawing and overlay is not None:
+        structure.append(layout_fingerprints(overlay, for_drawing=True))
+    if isinstance(obj, TableVector):
+        for cell in obj.cells:
+            cs, cc = layout_fingerprints(cell.content, for_drawing=for_drawing)
+            constraints = cell.constraints
+            if constraints is not None:
+                constraints = tuple(constraints)
+            structure.append(
+                (
+                    cell.label,
+                    cell.order,
+                    cell.width,
+                    cell.height,
+                    cell.visible,
+                    constraints,
+                    cs,
+                )
+            )
+            content.append(cc)
+    return _digest(structure), _digest(content)
+
+
+def layout_fingerprint(obj):
+    """Returns a fingerprint of the structure and style of an object."""
+    return layout_fingerprints(obj)[0]
+
+
+def draw_fingerprint(obj):
+    """Returns a fingerprint of everything which determines how an object and
+    its children are drawn relative to their position."""
+    return _digest(layout_fingerprints(obj, for_drawing=True))
+
+
+def _to_key(v):
+    if isinstance(v, list):
+        return tuple(_to_key(e) for e in v)
+    return v
+
+
+def _snapshot(obj):
+    structure, content = layout_fingerprints(obj)
+    node = {
+        "type": obj.__class__.__name__,
+        "structure": structure,
+        "content": content,
+        "rect": list(rect_geometry(obj.rect)),
+    }
+    if not isinstance(obj, TableVector):
+        return node
+    node["total"] = [obj.total_width, obj.total_height]
+    cache = obj.__dict__.get("_layout_cache", None)
+    if cache is not None and not obj.is_dirty:
+        node["layout_key"] = cache[0]
+    size_cache = obj.__dict__.get("_size_cache", None) or {}
+    node["size_cache"] = [
+        [with_padding, sizes, list(size)]
+        for with_padding, (sizes, size) in size_cache.items()
+    ]
+    node["cells"] = [_snapshot(cell.content) for cell in obj.cells]
+    return node
+
+
+def save_layout_snapshot(container, filename=None):
+    """Returns a JSON serializable snapshot of the computed layout of a
+    container and all of its children.  The snapshot is also written to
+    filename if specified."""
+    snapshot = _snapshot(container)
+    if filename is not None:
+        with open(filename, "w") as f:
+            json.dump(snapshot, f)
+    return snapshot
+
+
+def _move(geometry, dx, dy):
+    left, top, right, bottom = geometry
+    return left + dx, top + dy, right + dx, bottom + dy
+
+
+def _set_rect(obj, geometry):
+    left, top, right, bottom = geometry
+    obj.rect.set_size(right - left, top - bottom)
+    obj.rect.move_top_left_to((left, top))
+
+
+def _restore(obj, node, dx, dy, is_root=False):
+    if not node["type"] == obj.__class__.__name__:
+        return 0
+    structure, content = layout_fingerprints(obj)
+    if not node["structure"] == structure:
+        return 0
+    if not isinstance(obj, TableVector):
+        if node["content"] == content:
+            _set_rect(obj, _move(node["rect"], dx, dy))
+        return 0
+    restored = sum(
+        _restore(cell.content, child, dx, dy)
+        for cell, child in zip(obj.cells, node["cells"])
+    )
+    if not node["content"] == content or "layout_key" not in node:
+        return restored
+    # the size of the top level container is an input of its layout and
+    # is validated against the snapshot when its layout is re-used
+    if not is_root:
+        _set_rect(obj, _move(node["rect"], dx, dy))
+    obj.total_width, obj.total_height = node["total"]
+    obj.__dict__["_size_cache"] = {
+        with_padding: ([tuple(s) for s in sizes], tuple(size))
+        for with_padding, sizes, size in node["size_cache"]
+    }
+    obj.__dict__["_layout_cache"] = (
+        _to_key(node["layout_key"]),
+        _move(node["rect"], dx, dy),
+        [rect_geometry(cell.content.rect) for cell in obj.cells],
+    )
+    obj.mark_clean()
+    return restored + 1
+
+
+def load_layout_snapshot(container, snapshot):
+    """Restores the computed layout of every container in a tree whose structure,
+    style and content match a snapshot made with save_layout_snapshot.  The
+    layouts are restored relative to the current position of container and are
+    re-used by the next layout pass, so only the containers with changed
+    content are laid out again.  snapshot can be a dictionary or a JSON
+    filename.  Returns the number of restored containers."""
+    if isinstance(snapshot, str):
+        with open(snapshot, "r") as f:
+            snapshot = json.load(f)
+    left, top, _, _ = snapshot["rect"]
+    dx, dy = container.rect.left - left, container.rect.top - top
+    return _restore(container, snapshot, dx, dy, is_root=True)
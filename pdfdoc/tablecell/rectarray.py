@@ -0,0 +1,238 @@
+#! /usr/bin/env python3
+#
+# Copyright (C) 2020  Michael Gale
+
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# Structure of arrays batch of rects for vectorised layout math
+
+import numpy as np
+
+from toolbox import *
+
+
+class RectArray:
+    """A batch of rects stored as NumPy columns of left, top, right and bottom
+    edges.  Layout passes can translate, inset, align and stack every rect of a
+    container with a few array operations and then write the result back to
+    the cell rects once at the end."""
+
+    def __init__(self, left=(), top=(), right=(), bottom=()):
+        self.left = np.array(left, dtype=float).reshape(-1)
+        self.top = np.array(top, dtype=float).reshape(-1)
+        self.right = np.array(right, dtype=float).reshape(-1)
+        self.bottom = np.array(bottom, dtype=float).reshape(-1)
+
+    def __len__(self):
+        return len(self.left)
+
+    def __repr__(self):
+        return "%s(%d rects)" % (type(self).__name__, len(self))
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            r = Rect()
+            r.set_points(
+                (float(self.left[key]), float(self.bottom[key])),
+                (float(self.right[key]), float(self.top[key])),
+            )
+            return r
+        return RectArray(
+            self.left[key], self.top[key], self.right[key], self.bottom[key]
+        )
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    @staticmethod
+    def from_rects(rects):
+        """Makes a RectArray from a list of Rect objects."""
+        edges = np.array(
+            [(r.left, r.top, r.right, r.bottom) for r in rects], dtype=float
+        ).reshape((-1, 4))
+        return RectArray(*edges.T)
+
+    @staticmethod
+    def from_sizes(widths, heights):
+        """Makes a RectArray of rects centred on the origin, i.e. the same as
+        a list of Rect(width, height) objects."""
+        w = np.array(widths, dtype=float).reshape(-1)
+        h = np.array(heights, dtype=float).reshape(-1)
+        return RectArray(-w / 2, h / 2, w / 2, -h / 2)
+
+    def copy(self):
+        return RectArray(self.left, self.top, self.right, self.bottom)
+
+    def to_rects(self):
+        return [r for r in self]
+
+    def write_to(self, rects):
+        """Assigns the geometry of each rect in this batch to the corresponding
+        Rect object in rects in place."""
+        edges = zip(
+            self.left.tolist(),
+            self.top.tolist(),
+            self.right.tolist(),
+            self.bottom.tolist(),
+        )
+        for r, (left, top, right, bottom) in zip(rects, edges):
+            r.set_points((left, bottom), (right, top))
+
+    @property
+    def width(self):
+        return self.right - self.left
+
+    @property
+    def height(self):
+        return self.top - self.bottom
+
+    @property
+    def area(self):
+        return self.width * self.height
+
+    def translate(self, dx=0, dy=0):
+        """Moves every rect by an offset (scalar or per rect array)."""
+        self.left = self.left + dx
+        self.right = self.right + dx
+        self.top = self.top + dy
+        self.bottom = self.bottom + dy
+        return self
+
+    def move_top_left_to(self, x, y):
+        """Moves the top left corner of every rect to x, y (scalar or per rect
+        array) preserving their sizes."""
+        w, h = self.width, self.height
+        self.left = np.broadcast_to(np.asarray(x, dtype=float), w.shape).copy()
+        self.top = np.broadcast_to(np.asarray(y, dtype=float), h.shape).copy()
+        self.right = self.left + w
+        self.bottom = self.top - h
+        return self
+
+    def set_size(self, widths, heights):
+        """Re-sizes every rect about its top left corner."""
+        w = np.broadcast_to(np.asarray(widths, dtype=float), self.left.shape)
+        h = np.broadcast_to(np.asarray(heights, dtype=float), self.top.shape)
+        self.right = self.left + w
+        self.bottom = self.top - h
+        return self
+
+    def inset(self, left=0, top=None, right=None, bottom=None):
+        """Shrinks every rect by the specified amount on each side.  If only
+        left is specified, the same inset is applied to all four sides."""
+        top = left if top is None else top
+        right = left if right is None else right
+        bottom = top if bottom is None else bottom
+        self.left = self.left + left
+        self.top = self.top - top
+        self.right = self.right - right
+        self.bottom = self.bottom + bottom
+        return self
+
+    def bounding_rect(self):
+        """Returns a Rect which encloses every rect in this batch."""
+        r = Rect(0, 0)
+        if len(self) > 0:
+            r.set_points(
+                (float(self.left.min()), float(self.bottom.min())),
+                (float(self.right.max()), float(self.top.max())),
+            )
+        return r
+
+    def union(self, other=None):
+        """Returns the bounding Rect of this batch or, if other is a Rect or
+        RectArray, a new RectArray of the per rect union with other."""
+        if other is None:
+            return self.bounding_rect()
+        return RectArray(
+            np.minimum(self.left, other.left),
+            np.maximum(self.top, other.top),
+            np.maximum(self.right, other.right),
+            np.minimum(self.bottom, other.bottom),
+        )
+
+    def intersect(self, other):
+        """Returns a new RectArray of the intersection of each rect with other,
+        a Rect or RectArray.  Rects which do not intersect collapse to zero size."""
+        left = np.maximum(self.left, other.left)
+        top = np.minimum(self.top, other.top)
+        right = np.maximum(np.minimum(self.right, other.right), left)
+        bottom = np.minimum(np.maximum(self.bottom, other.bottom), top)
+        return RectArray(left, top, right, bottom)
+
+    def overlap_matrix(self, other=None):
+        """Returns a boolean matrix whose element i, j is True if rect i of this
+        batch overlaps rect j of other (or of this batch if other is None).
+        Rects which only share an edge do not overlap."""
+        other = self if other is None else other
+        m = (
+            (self.left[:, None] < other.right[None, :])
+            & (other.left[None, :] < self.right[:, None])
+            & (self.bottom[:, None] < other.top[None, :])
+            & (other.bottom[None, :] < self.top[:, None])
+        )
+        if other is self:
+            np.fill_diagonal(m, False)
+        return m
+
+    def align(self, bound, horz_align="centre", vert_align="centre"):
+        """Aligns every rect within bound (a Rect or RectArray) without changing
+        its size.  Alignments are left/centre/right and top/centre/bottom, or
+        None to leave an axis unchanged."""
+        w, h = self.width, self.height
+        if horz_align == "left":
+            x = bound.left
+        elif horz_align == "right":
+            x = bound.right - w
+        elif horz_align is not None:
+            x = bound.left + (bound.right - bound.left) / 2 - w / 2
+        else:
+            x = self.left
+        if vert_align == "top":
+            y = bound.top
+        elif vert_align == "bottom":
+            y = bound.bottom + h
+        elif vert_align is not None:
+            y = bound.top - (bound.top - bound.bottom) / 2 + h / 2
+        else:
+            y = self.top
+        return self.move_top_left_to(x, y)
+
+    def stack(self, bound, axis="width", reverse=False):
+        """Places the rects end to end along axis starting from the top left
+        corner of bound.  If reverse is True, the last rect is placed against
+        the right (axis="width") or bottom (axis="height") edge of bound and
+        the others are stacked back towards the start."""
+        n = len(self)
+        if axis == "width":
+            w = self.width
+            if reverse:
+                x = np.cumsum(np.concatenate(([bound.right], -w[::-1])))[1:][::-1]
+            else:
+                x = np.cumsum(np.concatenate(([bound.left], w)))[:-1]
+            y = np.full(n, float(bound.top))
+        else:
+            h = self.height
+            if reverse:
+                y = np.cumsum(np.concatenate(([bound.bottom], h[::-1])))[1:][::-1]
+            else:
+                y = np.cumsum(np.concatenate(([bound.top], -h)))[:-1]
+            x = np.full(n, float(bound.left))
+        return self.move_top_left_to(x, y)
@@ -25,9 +25,35 @@
 
 from toolbox import *
 from pdfdoc import *
+from pdfdoc.layoutstate import same_value
+
+# cell attributes which affect the layout of the parent container
+CELL_LAYOUT_ATTRS = (
+    "content",
+    "order",
+    "width",
+    "height",
+    "visible",
+    "constraints",
+)
 
 
 class TableCell:
+    # cells are numerous, so their attributes are kept in slots rather
+    # than a per instance dictionary
+    __slots__ = (
+        "parent",
+        "label",
+        "content",
+        "order",
+        "width",
+        "height",
+        "visible",
+        "constraints",
+        "can_overlap",
+        "__weakref__",
+    )
+
     def __init__(
         self,
         label,
@@ -38,6 +64,8 @@ class TableCell:
         constraints=None,
         **kwargs,
     ):
+        # the parent TableVector container which holds this cell
+        self.parent = None
         self.label = label
         # If no content is provided, create a placeholder ContentRect
         if content is not None:
@@ -59,10 +87,22 @@ class TableCell:
         self.can_overlap = False
         self.parse_kwargs(**kwargs)
 
+    def __setattr__(self, key, value):
+        old = getattr(self, key, None)
+        super().__setattr__(key, value)
+        parent = getattr(self, "parent", None)
+        if parent is None:
+            return
+        if key in ("parent", "content"):
+            if isinstance(self.content, LayoutStateMixin):
+                self.content.set_layout_parent(parent)
+        if key in CELL_LAYOUT_ATTRS and not same_value(old, value):
+            parent.mark_dirty()
+
     def parse_kwargs(self, **kwargs):
         for k, v in kwargs.items():
-            if k in self.__dict__:
-                self.__dict__[k] = v
+            if k in self.__slots__ and not k == "__weakref__":
+                object.__setattr__(self, k, v)
 
     def __repr__(self):
         return "%s(%r, %r, %.2f, %.2f, %r)" % (
@@ -23,6 +23,8 @@
 #
 # TableColumn class derived from TableVector
 
+import numpy as np
+
 from toolbox import *
 from pdfdoc import *
 
@@ -47,6 +49,7 @@ class TableColumn(TableVector):
         if cell is not None:
             cell.height = height
 
+    @static_content
     def draw_in_canvas(self, canvas, auto_size=None, auto_size_anchor=None):
         auto_size = auto_size if auto_size is not None else self.fit_to_contents
         if auto_size:
@@ -62,6 +65,9 @@ class TableColumn(TableVector):
             self.compute_cell_sizes("height")
 
     def get_content_size(self, with_padding=True):
+        size = self._cached_content_size(with_padding)
+        if size is not None:
+            return size
         sw, sh = 0, 0
         for cell in self.iter_cells():
             cw, ch = cell.content.get_content_size()
@@ -77,4 +83,116 @@ class TableColumn(TableVector):
             self.total_width = max(self.total_width, self.min_width)
         if self.min_height:
             self.total_height = max(self.total_height, self.min_height)
-        return self.total_width, self.total_height
+        return self._store_content_size(
+            with_padding, (self.total_width, self.total_height)
+        )
+
+    def _grid_rows(self):
+        return [
+            cell.content
+            for cell in self.iter_cells()
+            if isinstance(cell.content, TableRow)
+        ]
+
+    @staticmethod
+    def _is_plain_text(content):
+        if not isinstance(content, TextRect):
+            return False
+        return not (
+            content.is_fixed_width
+            or content.rotation
+            or content.expand_to_fit
+            or content.trim_callback is not None
+            or content.max_rect.width > 0
+        )
+
+    def get_column_width_bounds(self):
+        """Returns arrays of the minimum and maximum content widths of each column
+        of the TableRow rows of this container.  The maximum width is the width of
+        the widest cell on a single line and the minimum width is the narrowest
+        width without clipping, e.g. the longest word of wrapped text.  The text
+        of every cell is measured in one batch per font."""
+        rows = [list(row.iter_cells()) for row in self._grid_rows()]
+        ncols = max([len(cells) for cells in rows], default=0)
+        mins = np.zeros((len(rows), ncols))
+        maxs = np.zeros((len(rows), ncols))
+        batches = {}
+        for i, cells in enumerate(rows):
+            for j, cell in enumerate(cells):
+                content = cell.content
+                if not self._is_plain_text(content):
+                    w, _ = content.get_content_size()
+                    mins[i, j], maxs[i, j] = w, w
+                elif content.text:
+                    key = (content.font, content.font_size, content.kerning)
+                    batches.setdefault(key, []).append((i, j, content))
+        for (font, font_size, kerning), items in batches.items():
+            texts = [content.text for _, _, content in items]
+            words = [content.text.split() or [""] for _, _, content in items]
+            widths = get_string_widths(texts, font, font_size)
+            flat = [word for text_words in words for word in text_words]
+            word_widths = get_string_widths(flat, font, font_size)
+            if kerning:
+                kern = kerning * font_size
+                widths += kern * np.maximum([len(t) - 1 for t in texts], 0)
+                word_widths += kern * np.maximum([len(w) - 1 for w in flat], 0)
+            offsets = np.cumsum([0] + [len(w) for w in words[:-1]])
+            longest = np.maximum.reduceat(word_widths, offsets)
+            idx = tuple(np.array([(i, j) for i, j, _ in items]).T)
+            pad = np.array([c.style.width_pad_margin for _, _, c in items])
+            wraps = np.array(
+                [c.split_lines and not c.shrink_to_fit for _, _, c in items]
+            )
+            shrinks = np.array([c.shrink_to_fit or c.clip_text for _, _, c in items])
+            maxs[idx] = widths + pad
+            mins[idx] = np.where(
+                shrinks, pad, np.where(wraps, longest + pad, maxs[idx])
+            )
+        return mins.max(axis=0, initial=0), maxs.max(axis=0, initial=0)
+
+    def auto_fit_columns(self, width=None):
+        """Assigns width ratios to the AUTO_SIZE columns of the TableRow rows of this
+        container so that their content fits in one layout pass.  Fixed ratio
+        and CONTENT_SIZE columns are honoured and the remaining width is shared
+        by the AUTO_SIZE columns in proportion to their content.  Columns are
+        given at least their minimum content width if there is enough room.
+        The column specifications of the first row are kept so that the table
+        can be fitted again if its content changes.  Returns an array of the
+        column widths."""
+        rows = self._grid_rows()
+        if not rows:
+            return np.zeros(0)
+        mins, maxs = self.get_column_width_bounds()
+        specs = self.__dict__.get("_auto_fit_specs", None)
+        if specs is None or not len(specs) == len(maxs):
+            specs = np.zeros(len(maxs))
+            for j, cell in enumerate(rows[0].iter_cells()):
+                specs[j] = cell.width
+            self.__dict__["_auto_fit_specs"] = specs
+        width = (
+            width if width is not None else self.style.get_inset_rect(self.rect).width
+        )
+        avail = width - rows[0].style.width_pad_margin
+        widths = np.where(specs > 0, specs * avail, 0)
+        widths = np.where(specs == CONTENT_SIZE, maxs, widths)
+        auto = specs == AUTO_SIZE
+        rem = avail - widths.sum()
+        mn, mx = mins[auto], maxs[auto]
+        if not auto.any() or rem <= 0:
+            pass
+        elif mx.sum() <= rem:
+            # every column fits on one line, share the remaining space
+            share = mx / mx.sum() if mx.sum() > 0 else np.full(len(mx), 1 / len(mx))
+            widths[auto] = mx + (rem - mx.sum()) * share
+        elif mn.sum() <= rem and (mx - mn).sum() > 0:
+            # grow columns from their minimum width towards their maximum
+            widths[auto] = mn + (rem - mn.sum()) * (mx - mn) / (mx - mn).sum()
+        elif mn.sum() > 0:
+            widths[auto] = mn * rem / mn.sum()
+        if avail > 0:
+            ratios = widths / avail
+            for row in rows:
+                for j, cell in enumerate(row.iter_cells()):
+                    if auto[j]:
+                        cell.width = ratios[j]
+        return widths
@@ -89,6 +89,9 @@ class TableGrid(TableVector):
         return "\n".join(s)
 
     def compute_cell_sizes(self):
+        if self.reuse_layout("grid", size_is_output=True):
+            return
+        prev_sizes = self._cell_sizes()
         self.compute_cell_order()
         if self.is_fixed_width:
             self.width_constraint = self.fixed_rect.width
@@ -104,22 +107,9 @@ class TableGrid(TableVector):
             self.layout_opts["gutter"] = self.style["gutter-width"]
         if self.style["gutter-height"] > 0 and self.fill_dir == "row-wise":
             self.layout_opts["gutter"] = self.style["gutter-height"]
-        new_rects = Rect.layout_rects(
-            rects,
-            cell_rect,
-            row_wise=(self.fill_dir == "row-wise"),
-            vert_align=self.style["vert-align"],
-            horz_align=self.style["horz-align"],
-            auto_adjust=self.auto_adjust,
-            align_cols=self.align_cols,
-            as_rect=False,
-            **self.layout_opts,
-        )
-        if self.auto_refill and not self.is_shape_good(new_rects):
-            # if a grid has been forced to layout cells opposite to the
-            # desired fill direction, then swap and re-layout
-            fill = "row-wise" if self.fill_dir == "column-wise" else "column-wise"
-            new_rects = Rect.layout_rects(
+
+        def layout(fill):
+            return Rect.layout_rects(
                 rects,
                 cell_rect,
                 row_wise=(fill == "row-wise"),
@@ -131,11 +121,18 @@ class TableGrid(TableVector):
                 **self.layout_opts,
             )
 
+        new_rects = layout(self.fill_dir)
+        if self.auto_refill and not self.is_shape_good(new_rects):
+            # if a grid has been forced to layout cells opposite to the
+            # desired fill direction, then swap and re-layout re-using the
+            # already measured cell sizes
+            fill = "row-wise" if self.fill_dir == "column-wise" else "column-wise"
+            new_rects = layout(fill)
+
         self.gutters_from_rects(new_rects)
-        for idx, cell in enumerate(self.iter_cells()):
-            cell.content.rect.set_size(new_rects[idx].width, new_rects[idx].height)
-            cell.content.top_left = (new_rects[idx].left, new_rects[idx].top)
-        bounds = Rect.bounding_rect_from_rects(new_rects)
+        placed = RectArray.from_rects(new_rects)
+        placed.write_to([cell.content.rect for cell in self.iter_cells()])
+        bounds = placed.bounding_rect()
         self.total_width = bounds.width + self.style.width_pad_margin
         self.total_height = bounds.height + self.style.height_pad_margin
         if self.min_width:
@@ -145,6 +142,12 @@ class TableGrid(TableVector):
         self.rect.set_size(self.total_width, self.total_height)
         self.top_left = top_left_corner
         self.assign_cell_overlay_content_rects()
+        self._store_layout("grid", prev_sizes)
+
+    def _translate_layout(self, dx, dy):
+        super()._translate_layout(dx, dy)
+        if self.gutters is not None:
+            RectArray.from_rects(self.gutters).translate(dx, dy).write_to(self.gutters)
 
     def is_shape_good(self, rects):
         rows, cols = RectCell.shape_from_rects(rects)
@@ -188,6 +191,7 @@ class TableGrid(TableVector):
                 y = gutter.top - gutter.height / 2
                 c.line(gutter.left, y, gutter.right)
 
+    @static_content
     def draw_in_canvas(self, canvas):
         self.draw_cells_in_canvas(canvas)
         self.draw_gutter_lines(canvas)
@@ -47,6 +47,7 @@ class TableRow(TableVector):
         if cell is not None:
             cell.width = width
 
+    @static_content
     def draw_in_canvas(self, canvas, auto_size=None, auto_size_anchor=None):
         auto_size = auto_size if auto_size is not None else self.fit_to_contents
         if auto_size:
@@ -62,6 +63,9 @@ class TableRow(TableVector):
             self.compute_cell_sizes("width")
 
     def get_content_size(self, with_padding=True):
+        size = self._cached_content_size(with_padding)
+        if size is not None:
+            return size
         sw, sh = 0, 0
         for cell in self.iter_cells():
             cw, ch = cell.content.get_content_size()
@@ -77,4 +81,6 @@ class TableRow(TableVector):
             self.total_width = max(self.total_width, self.min_width)
         if self.min_height:
             self.total_height = max(self.total_height, self.min_height)
-        return self.total_width, self.total_height
+        return self._store_content_size(
+            with_padding, (self.total_width, self.total_height)
+        )
@@ -26,11 +26,14 @@
 import random
 import string
 
+import numpy as np
+
 from toolbox import *
 from pdfdoc import *
+from pdfdoc.layoutstate import rect_geometry
 
 
-class TableVector(DocStyleMixin, RectMixin):
+class TableVector(LayoutStateMixin, DocStyleMixin, RectMixin):
     def __init__(self, w=0, h=0, style=None):
         self.rect = Rect()
         self.rect.set_size(w, h)
@@ -49,6 +52,7 @@ class TableVector(DocStyleMixin, RectMixin):
         self.fixed_rect = Rect(w, h)
         self.min_width = 0
         self.min_height = 0
+        self.is_static = False
 
     def parse_kwargs(self, **kwargs):
         for k, v in kwargs.items():
@@ -108,13 +112,26 @@ class TableVector(DocStyleMixin, RectMixin):
 
     def iter_cells(self, only_visible=True):
         self.compute_cell_order()
+        cells = {}
+        for cell in self.cells:
+            cells.setdefault(cell.label, []).append(cell)
         for cell_label in self.cell_order:
-            for cell in self.cells:
-                if not cell_label == cell.label:
-                    continue
+            for cell in cells.get(cell_label, ()):
                 if not only_visible or cell.visible:
                     yield cell
 
+    def get_cell_index(self):
+        """Returns a spatial index of the visible cell rects.  The index is
+        re-built only when the cells or their layout have changed."""
+        cells = list(self.iter_cells())
+        key = [(id(cell), rect_geometry(cell.content.rect)) for cell in cells]
+        cache = self.__dict__.get("_cell_index", None)
+        if cache is not None and cache[0] == key:
+            return cache[1]
+        index = CellIndex([(cell, cell.content.rect) for cell in cells])
+        self.__dict__["_cell_index"] = (key, index)
+        return index
+
     def is_cell_on_transparent_rect(self, cell, other):
         """Determines if other cell safely overlaps a transparent region
         of a cell with an ImageRect."""
@@ -138,34 +155,40 @@ class TableVector(DocStyleMixin, RectMixin):
         """Determines if cell overlapped any of its peers."""
         if not self.is_cell_visible(label):
             return False
-        other_cells = [c.label for c in self.iter_cells() if not c.label == label]
-        r1 = self.get_cell_rect(label)
-        if r1 is None:
-            return False
-        for other in other_cells:
-            if r1.overlaps(self.get_cell_rect(other)):
-                if not self.is_cell_on_transparent_rect(label, other):
-                    return True
+        cell = self[label]
+        index = self.get_cell_index()
+        for other in index.overlaps_of(cell.content.rect, exclude=cell):
+            if not self.is_cell_on_transparent_rect(label, other.label):
+                return True
         return False
 
+    def _is_pair_overlapped(self, cell, other):
+        if not self.is_cell_on_transparent_rect(cell.label, other.label):
+            return True
+        return not self.is_cell_on_transparent_rect(other.label, cell.label)
+
     def has_overlapped_cells(self):
         """Determines if any child cells mutually overlap."""
-        other_cells = [cell.label for cell in self.iter_cells()]
-        for cell in self.iter_cells():
-            for other in other_cells:
-                if other == cell.label:
-                    continue
-                r1 = self.get_cell_rect(cell.label)
-                if r1.overlaps(self.get_cell_rect(other)):
-                    if not self.is_cell_on_transparent_rect(cell.label, other):
-                        return True
+        for cell, other in self.get_cell_index().overlapping_pairs():
+            if self._is_pair_overlapped(cell, other):
+                return True
         return False
 
+    def get_overlapped_cells(self):
+        """Returns the labels of all cells which overlap any of their peers."""
+        labels = set()
+        for cell, other in self.get_cell_index().overlapping_pairs():
+            if self._is_pair_overlapped(cell, other):
+                labels.update((cell.label, other.label))
+        return [cell.label for cell in self.iter_cells() if cell.label in labels]
+
     def is_cell_clipped(self, label, tol=1e-2):
         """Determines if a cell is clipped by its parent."""
         if not self.is_cell_visible(label):
             return False
-        r1 = self.get_cell_rect(label)
+        return self._is_rect_clipped(self.get_cell_rect(label), tol)
+
+    def _is_rect_clipped(self, r1, tol):
         if r1.left < self.rect.left and abs(r1.left - self.rect.left) > tol:
             return True
         if r1.right > self.rect.right and abs(r1.right - self.rect.right) > tol:
@@ -176,10 +199,20 @@ class TableVector(DocStyleMixin, RectMixin):
             return True
         return False
 
+    def get_clipped_cells(self, tol=1e-2):
+        """Returns the labels of all cells which extend outside the parent."""
+        return [
+            cell.label
+            for cell in self.iter_cells()
+            if self._is_rect_clipped(cell.content.rect, tol)
+        ]
+
     def has_clipped_cells(self, tol=1e-2):
         """Determines if any child cells extend outside the parent container."""
-        all_rects = self.get_cell_rects(as_is=True)
-        brect = Rect.bounding_rect_from_rects(all_rects)
+        rects = RectArray.from_rects(self.get_cell_rects(as_is=True))
+        if not len(rects):
+            return False
+        brect = rects.bounding_rect()
         if brect.left < self.rect.left:
             if abs(brect.left - self.rect.left) > tol:
                 return True
@@ -220,6 +253,7 @@ class TableVector(DocStyleMixin, RectMixin):
         width = width if width is not None else AUTO_SIZE
         height = height if height is not None else AUTO_SIZE
         cell = TableCell(label, content, order, width=width, height=height)
+        cell.parent = self
         self.cells.append(cell)
 
     def add_content(self, content=None, order=None, height=None, width=None):
@@ -312,92 +346,119 @@ class TableVector(DocStyleMixin, RectMixin):
         ocells = sorted(cells, key=lambda x: x[0])
         self.cell_order = [cell[1] for cell in ocells]
 
+    def _cell_sizes(self):
+        return [
+            (cell.content.rect.width, cell.content.rect.height) for cell in self.cells
+        ]
+
+    def _translate_layout(self, dx, dy):
+        """Moves the cells of a previously computed layout by an offset."""
+        rects = [cell.content.rect for cell in self.iter_cells()]
+        RectArray.from_rects(rects).translate(dx, dy).write_to(rects)
+        self.assign_cell_overlay_content_rects()
+
+    def reuse_layout(self, key, size_is_output=False):
+        """Returns True if the layout previously computed with the same key is
+        still valid, i.e. this container is clean and none of its cells have been
+        changed since.  If the container has only moved, its cells are translated
+        rather than laid out again.  If size_is_output is True, the container's
+        size is a result of its layout and is restored from the previous layout."""
+        cache = self.__dict__.get("_layout_cache", None)
+        if cache is None or self.is_dirty or not cache[0] == key:
+            return False
+        _, own, cells = cache
+        if not [rect_geometry(cell.content.rect) for cell in self.cells] == cells:
+            return False
+        left, top, right, bottom = own
+        r = self.rect
+        if size_is_output:
+            r.set_size_anchored(right - left, top - bottom, anchor_pt="top left")
+        elif (
+            abs(r.width - (right - left)) > 1e-6
+            or abs(r.height - (top - bottom)) > 1e-6
+        ):
+            return False
+        dx, dy = r.left - left, r.top - top
+        if abs(dx) > 0 or abs(dy) > 0:
+            self._translate_layout(dx, dy)
+        self._store_layout(key)
+        return True
+
+    def _store_layout(self, key, prev_sizes=None):
+        """Keeps a record of a newly computed layout so that it can be re-used
+        by reuse_layout.  If the layout changed the size of any cell then
+        the ancestors of this container are flagged to be laid out again."""
+        cells = [rect_geometry(cell.content.rect) for cell in self.cells]
+        self.__dict__["_layout_cache"] = (key, rect_geometry(self.rect), cells)
+        self.mark_clean()
+        parent = self.layout_parent
+        if prev_sizes is not None and parent is not None:
+            if not self._cell_sizes() == prev_sizes:
+                parent.mark_dirty()
+
+    def _cached_content_size(self, with_padding):
+        """Returns a previously computed content size if this container is clean
+        and none of its cells have been re-sized since."""
+        cache = self.__dict__.get("_size_cache", None)
+        if cache is None or with_padding not in cache:
+            return None
+        sizes, size = cache[with_padding]
+        if not sizes == self._cell_sizes():
+            return None
+        self.total_width, self.total_height = size
+        return size
+
+    def _store_content_size(self, with_padding, size):
+        if self.__dict__.get("_size_cache", None) is None:
+            self.__dict__["_size_cache"] = {}
+        self.__dict__["_size_cache"][with_padding] = (self._cell_sizes(), size)
+        return size
+
     def compute_cell_sizes(self, axis="width"):
+        if self.reuse_layout(axis):
+            return
+        prev_sizes = self._cell_sizes()
         self.compute_cell_order()
         cell_rect = self.style.get_inset_rect(self.rect)
-        total_limit = cell_rect.width if axis == "width" else cell_rect.height
-        acc_size = 0
-        unassigned = []
         axis_width = axis == "width"
-        cr_height = cell_rect.height
-        cr_width = cell_rect.width
+        total_limit = cell_rect.width if axis_width else cell_rect.height
+        cells = list(self.iter_cells())
+        sizes = np.zeros(len(cells))
+        unassigned = np.zeros(len(cells), dtype=bool)
 
         # set cell size for cells with a specification
-        for cell in self.iter_cells():
-            if axis_width:
-                if cell.width > 0:
-                    cwidth = cell.width * total_limit
-                    cell.content.size = (cwidth, cr_height)
-                    acc_size += cwidth
-                elif cell.width == CONTENT_SIZE:
-                    cw, ch = cell.content.get_content_size()
-                    # cw += cell.content.style.get_width_trim()
-                    cell.content.size = (cw, cr_height)
-                    acc_size += cw
-                else:
-                    unassigned.append(cell.label)
+        for idx, cell in enumerate(cells):
+            spec = cell.width if axis_width else cell.height
+            if spec > 0:
+                sizes[idx] = spec * total_limit
+            elif spec == CONTENT_SIZE:
+                cw, ch = cell.content.get_content_size()
+                sizes[idx] = cw if axis_width else ch
             else:
-                if cell.height > 0:
-                    cheight = cell.height * total_limit
-                    cell.content.size = (cr_width, cheight)
-                    acc_size += cheight
-                elif cell.height == CONTENT_SIZE:
-                    cw, ch = cell.content.get_content_size()
-                    # ch += cell.content.style.get_height_trim()
-                    cell.content.size = (cr_width, ch)
-                    acc_size += ch
-                else:
-                    unassigned.append(cell.label)
+                unassigned[idx] = True
 
         # set cell sizes for remaining cells automatically
         # based on the remaining space in the table vector
-        rem_size = total_limit - acc_size
-        if len(unassigned) > 0 and rem_size > 0:
-            csize = rem_size / len(unassigned)
+        rem_size = total_limit - sizes.sum()
+        if np.any(unassigned) and rem_size > 0:
+            sizes[unassigned] = rem_size / np.count_nonzero(unassigned)
+
+        # stack the cells in cell order along the axis and write the
+        # resulting rects back to the cells in one pass
+        if axis_width:
+            rects = RectArray.from_sizes(sizes, np.full(len(cells), cell_rect.height))
+            reverse = self.style["horz-align"] == "right"
         else:
-            csize = 0
-        for ucell in unassigned:
-            for cell in self.cells:
-                if not (cell.label == ucell and cell.visible):
-                    continue
-                if axis == "width":
-                    cell.content.size = (csize, cr_height)
-                else:
-                    cell.content.size = (cr_width, csize)
-                acc_size += csize
-
-        # move each cells's origin based on the cell order
-        inv_valign = axis == "height" and self.style["vert-align"] == "bottom"
-        inv_halign = axis == "width" and self.style["horz-align"] == "right"
-        cy = cell_rect.bottom if inv_valign else cell_rect.top
-        cx = cell_rect.right if inv_halign else cell_rect.left
-        ordered = (
-            self.cell_order
-            if (not inv_valign and not inv_halign)
-            else reversed(self.cell_order)
-        )
-        for cell_label in ordered:
-            for cell in self.cells:
-                if not (cell_label == cell.label and cell.visible):
-                    continue
-                if inv_valign:
-                    cy += cell.content.rect.height
-                if inv_halign:
-                    cx -= cell.content.rect.width
-                cell.content.top_left = (cx, cy)
-                if axis == "width" and not inv_halign:
-                    cx += cell.content.rect.width
-                if axis == "height" and not inv_valign:
-                    cy -= cell.content.rect.height
+            rects = RectArray.from_sizes(np.full(len(cells), cell_rect.width), sizes)
+            reverse = self.style["vert-align"] == "bottom"
+        rects.stack(cell_rect, axis, reverse=reverse)
+        rects.write_to([cell.content.rect for cell in cells])
         self.assign_cell_overlay_content_rects()
+        self._store_layout(axis, prev_sizes)
 
     def get_content_size(self, with_padding=True):
         self.compute_cell_sizes()
-        r = self.get_cell_rects(as_is=True)
-        if len(r) > 0:
-            rb = Rect.bounding_rect_from_rects(r)
-        else:
-            rb = Rect(0, 0)
+        rb = RectArray.from_rects(self.get_cell_rects(as_is=True)).bounding_rect()
         self.total_width = rb.width
         self.total_height = rb.height
         if with_padding:
@@ -472,6 +533,8 @@ class TableVector(DocStyleMixin, RectMixin):
             self.overlay_content.rect = self.style.get_inset_rect(self.rect)
 
     def draw_cells_in_canvas(self, canvas, axis=None):
+        if is_culled(canvas, self.rect):
+            return
         if axis is not None:
             self.compute_cell_sizes(axis)
         self.draw_background(canvas)
@@ -479,7 +542,9 @@ class TableVector(DocStyleMixin, RectMixin):
             for cell in self.iter_cells():
                 cell.content.show_debug_rects = True
         for cell in self.iter_cells():
-            cell.content.draw_in_canvas(canvas)
+            # cells outside the canvas viewport are skipped with their subtree
+            if not is_culled(canvas, cell.content.rect):
+                cell.content.draw_in_canvas(canvas)
         self.draw_border_lines(canvas)
         if self.overlay_content is not None:
             self.overlay_content.draw_in_canvas(canvas)
@@ -0,0 +1,377 @@
+#! /usr/bin/env python3
+#
+# Copyright (C) 2020  Michael Gale
+
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without restriction,
+# including without limitation the rights to use, copy, modify, merge,
+# publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so,
+# subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY
+# CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# TextTable columnar table container class
+
+import csv
+
+import numpy as np
+
+from toolbox import *
+from pdfdoc import *
+
+
+class TextTable(LayoutStateMixin, DocStyleMixin, RectMixin):
+    """A table of text cells which is stored column by column rather than as a
+    graph of TableRow and TextRect objects.  Each column keeps a list of cell
+    strings, a width specification and a single TextRect whose style is shared
+    by every cell in the column.  This TextRect is re-used to measure and draw
+    each cell, so no per cell objects are created, even while drawing.
+
+    Column widths follow the same specifications as TableRow columns, i.e. a
+    fraction of the table width, CONTENT_SIZE or AUTO_SIZE to share the
+    remaining width.  row_height is either a fraction of the table height,
+    CONTENT_SIZE for each row to be the height of its tallest cell, or
+    AUTO_SIZE for rows to share the table height (but never be shorter than
+    their content).  Rows which do not fit in the table rect are not drawn;
+    first_row and drawn_rows can be used to continue a table on another page."""
+
+    def __init__(self, w=0, h=0, style=None, **kwargs):
+        self.rect = Rect()
+        self.rect.set_size(w, h)
+        self.style = DocStyle()
+        if style is not None:
+            self.style.set_with_dict(style)
+        self.labels = []
+        self.columns = []
+        self.column_widths = []
+        self.column_rects = []
+        self.header_rects = []
+        self.show_header = False
+        self.row_height = CONTENT_SIZE
+        self.first_row = 0
+        self.fit_to_contents = False
+        self.show_debug_rects = False
+        self.total_width = 0
+        self.total_height = 0
+        self.parse_kwargs(**kwargs)
+
+    def parse_kwargs(self, **kwargs):
+        for k, v in kwargs.items():
+            if k in self.__dict__:
+                self.__dict__[k] = v
+            elif k in RectMixin.__dict__:
+                if k == "top_left":
+                    self.top_left = v
+                elif k == "top_right":
+                    self.top_right = v
+                elif k == "bottom_left":
+                    self.bottom_left = v
+                elif k == "bottom_right":
+                    self.bottom_right = v
+                elif k == "centre":
+                    self.centre = v
+            else:
+                self.style[k] = v
+
+    def __len__(self):
+        return self.row_count
+
+    def __repr__(self):
+        return "%s(%.2f, %.2f, rows=%d, columns=%d)" % (
+            self.__class__.__name__,
+            self.rect.width,
+            self.rect.height,
+            self.row_count,
+            self.column_count,
+        )
+
+    @property
+    def row_count(self):
+        return max([len(column) for column in self.columns], default=0)
+
+    @property
+    def column_count(self):
+        return len(self.columns)
+
+    @property
+    def drawn_rows(self):
+        """The number of rows drawn by the most recent call to draw_in_canvas."""
+        return self.__dict__.get("_drawn_rows", 0)
+
+    def add_column(self, label, values, width=AUTO_SIZE, style=None):
+        """Adds a column of cells.  values can be any iterable, e.g. a list or
+        a NumPy array, and are stored as strings."""
+        if isinstance(values, np.ndarray):
+            values = values.astype(str).tolist()
+        else:
+            values = [str(v) if not isinstance(v, str) else v for v in values]
+        self.labels.append(label)
+        self.columns.append(values)
+        self.column_widths.append(width)
+        self.column_rects.append(self._shared_rect(style))
+        self.header_rects.append(self._shared_rect(style))
+        self.__dict__["_text_sizes"] = None
+        self.mark_dirty()
+
+    def _shared_rect(self, style):
+        tr = TextRect(style=style)
+        tr.set_layout_parent(self)
+        return tr
+
+    def column_index(self, label):
+        if isinstance(label, int):
+            return label
+        return self.labels.index(label)
+
+    def set_column_width(self, label, width):
+        self.column_widths[self.column_index(label)] = width
+        self.mark_dirty()
+
+    def set_column_style(self, label, style):
+        """Updates the style shared by every cell of a column."""
+        self.column_rects[self.column_index(label)].style.set_with_dict(style)
+
+    def set_header_style(self, style, label=None):
+        """Updates the header style of one or all columns."""
+        rects = self.header_rects
+        if label is not None:
+            rects = [rects[self.column_index(label)]]
+        for tr in rects:
+            tr.style.set_with_dict(style)
+
+    def get_column_style(self, label):
+        return self.column_rects[self.column_index(label)].style
+
+    def get_cell_text(self, row, label):
+        column = self.columns[self.column_index(label)]
+        return column[row] if row < len(column) else ""
+
+    def set_cell_text(self, row, label, text):
+        self.columns[self.column_index(label)][row] = str(text)
+        self.mark_dirty()
+
+    def get_row(self, row):
+        return [self.get_cell_text(row, j) for j in range(self.column_count)]
+
+    def _cell_sizes(self, j, width):
+        """Returns an array of the content (width, height) of each cell in a
+        column.  Each distinct string is only measured once."""
+        tr = self.column_rects[j]
+        if width is not None:
+            tr.rect.set_size(width, tr.rect.height)
+        # without a width, cells are measured at the current width of the
+        # shared column TextRect
+        fit_width = tr.split_lines or tr.shrink_to_fit or tr.expand_to_fit
+        key = (tr.style.version, tr.rect.width if fit_width else None)
+        cache = self.__dict__.get("_text_sizes", None)
+        if cache is None:
+            cache = self.__dict__["_text_sizes"] = [None] * self.column_count
+        if cache[j] is None or not cache[j][0] == key:
+            cache[j] = (key, {})
+        sizes = cache[j][1]
+        column = self.columns[j]
+        for text in set(column).difference(sizes):
+            tr.__dict__["text"] = text
+            sizes[text] = tr.get_content_size()
+        sizes = np.array([sizes[text] for text in column], dtype=float)
+        sizes = sizes.reshape((-1, 2))
+        # short columns are padded with empty cells
+        if len(column) < self.row_count:
+            sizes = np.vstack((sizes, np.zeros((self.row_count - len(column), 2))))
+        return sizes
+
+    def _header_sizes(self, widths=None):
+        if not self.show_header:
+            return np.zeros((self.column_count, 2))
+        sizes = []
+        for j, tr in enumerate(self.header_rects):
+            if widths is not None:
+                tr.rect.set_size(widths[j], tr.rect.height)
+            tr.__dict__["text"] = str(self.labels[j])
+            sizes.append(tr.get_content_size())
+        return np.array(sizes, dtype=float).reshape((-1, 2))
+
+    def _natural_widths(self):
+        widths = np.zeros(self.column_count)
+        for j in range(self.column_count):
+            w = self._cell_sizes(j, None)[:, 0]
+            widths[j] = w.max() if len(w) else 0
+        return np.maximum(widths, self._header_sizes()[:, 0])
+
+    def compute_column_widths(self):
+        """Returns an array of the width of each column within the table rect."""
+        total_limit = self.style.get_inset_rect(self.rect).width
+        specs = np.array(self.column_widths, dtype=float)
+        widths = np.zeros(self.column_count)
+        fixed = specs > 0
+        widths[fixed] = specs[fixed] * total_limit
+        content = specs == CONTENT_SIZE
+        if self.fit_to_contents:
+            content |= specs == AUTO_SIZE
+        if content.any():
+            widths[content] = self._natural_widths()[content]
+        auto = ~(fixed | content)
+        rem_size = total_limit - widths.sum()
+        if auto.any() and rem_size > 0:
+            widths[auto] = rem_size / auto.sum()
+        return widths
+
+    def compute_row_heights(self, widths):
+        """Returns an array of the height of each row for the given column
+        widths and the height of the header row."""
+        heights = np.zeros(self.row_count)
+        for j in range(self.column_count):
+            heights = np.maximum(heights, self._cell_sizes(j, widths[j])[:, 1])
+        header_height = self._header_sizes(widths)[:, 1].max(initial=0)
+        total_limit = self.style.get_inset_rect(self.rect).height - header_height
+        if self.row_height > 0:
+            heights[:] = self.row_height * total_limit
+        elif self.row_height == AUTO_SIZE and self.row_count > 0:
+            heights = np.maximum(heights, total_limit / self.row_count)
+        return heights, header_height
+
+    def compute_cell_sizes(self):
+        """Computes the column widths and row heights of the table.  The result
+        is re-used until the table, its styles or its size change."""
+        inset_rect = self.style.get_inset_rect(self.rect)
+        key = (inset_rect.width, inset_rect.height, self.row_height)
+        layout = self.__dict__.get("_layout", None)
+        if layout is not None and layout[0] == key and not self.is_dirty:
+            return layout[1:]
+        widths = self.compute_column_widths()
+        heights, header_height = self.compute_row_heights(widths)
+        self.__dict__["_layout"] = (key, widths, heights, header_height)
+        self.mark_clean()
+        return widths, heights, header_height
+
+    def get_content_size(self, with_padding=True):
+        widths = self._natural_widths()
+        heights = np.zeros(self.row_count)
+        for j in range(self.column_count):
+            heights = np.maximum(heights, self._cell_sizes(j, widths[j])[:, 1])
+        header_height = self._header_sizes(widths)[:, 1].max(initial=0)
+        self.total_width = float(widths.sum())
+        self.total_height = float(heights.sum() + header_height)
+        if with_padding:
+            self.total_width += self.style.width_pad_margin
+            self.total_height += self.style.height_pad_margin
+        return self.total_width, self.total_height
+
+    def visible_rows(self):
+        """Returns the range of row indices which fit in the table rect starting
+        at first_row."""
+        _, heights, header_height = self.compute_cell_sizes()
+        avail = self.style.get_inset_rect(self.rect).height - header_height
+        bottoms = np.cumsum(heights[self.first_row :])
+        count = int(np.searchsorted(bottoms, avail + 1e-6, side="right"))
+        return range(self.first_row, self.first_row + count)
+
+    def _draw_cell(self, c, tr, text, x, y, w, h):
+        tr.__dict__["text"] = text
+        tr.__dict__["show_debug_rects"] = self.show_debug_rects
+        tr.rect.set_size(w, h)
+        tr.rect.move_top_left_to((x, y))
+        tr.draw_in_canvas(c)
+
+    def draw_in_canvas(self, canvas, auto_size=None, auto_size_anchor=None):
+        auto_size = auto_size if auto_size is not None else self.fit_to_contents
+        if auto_size:
+            w, h = self.get_content_size()
+            anchor = "top left" if auto_size_anchor is None else auto_size_anchor
+            self.rect.set_size_anchored(w, h, anchor_pt=anchor)
+        widths, heights, header_height = self.compute_cell_sizes()
+        rl_draw_rect(canvas, self.rect, self.style)
+        inset_rect = self.style.get_inset_rect(self.rect)
+        lefts = inset_rect.left + np.concatenate(([0], np.cumsum(widths)[:-1]))
+        y = inset_rect.top
+        if self.show_header:
+            for j, tr in enumerate(self.header_rects):
+                text = str(self.labels[j])
+                self._draw_cell(canvas, tr, text, lefts[j], y, widths[j], header_height)
+            y -= header_height
+        rows = self.visible_rows()
+        viewport = get_canvas_viewport(canvas)
+        for i in rows:
+            row_rect = Rect(inset_rect.width, heights[i])
+            row_rect.move_top_left_to((inset_rect.left, y))
+            h = heights[i]
+            if viewport is None or not is_culled(canvas, row_rect):
+                for j, tr in enumerate(self.column_rects):
+                    text = self.get_cell_text(i, j)
+                    self._draw_cell(canvas, tr, text, lefts[j], y, widths[j], h)
+            y -= h
+        self.__dict__["_drawn_rows"] = len(rows)
+        if self.show_debug_rects:
+            self.draw_debug_rect(canvas, self.rect)
+            self.draw_debug_rect(canvas, inset_rect, DEBUG_INSET_COLOUR)
+
+    def draw_debug_rect(self, c, r, colour=None):
+        lw = 0.5 if colour is None else 0.2
+        dash = [1, 2, 1, 0] if colour is None else [0.5, 0.5, 0.5, 0]
+        colour = colour if colour is not None else DEBUG_RECT_COLOUR
+        c.saveState()
+        c.setFillColor(rl_colour_trans())
+        c.setStrokeColor(rl_colour(colour))
+        c.setDash(dash)
+        c.setLineWidth(lw)
+        c.rect(r.left, r.bottom, r.width, r.height, stroke=True, fill=False)
+        c.restoreState()
+
+    @staticmethod
+    def from_columns(
+        columns,
+        labels=None,
+        style=None,
+        element_style=None,
+        fit_to_contents=True,
+        **kwargs
+    ):
+        """Makes a TextTable from a list of columns or a dictionary of labelled
+        columns.  Each column can be any iterable, e.g. a list or a NumPy array."""
+        if isinstance(columns, dict):
+            labels = list(columns.keys()) if labels is None else labels
+            columns = list(columns.values())
+        labels = [] if labels is None else list(labels)
+        labels.extend("Column%d" % (j + 1) for j in range(len(labels), len(columns)))
+        t = TextTable(style=style, fit_to_contents=fit_to_contents, **kwargs)
+        sizing = CONTENT_SIZE if fit_to_contents else AUTO_SIZE
+        for label, values in zip(labels, columns):
+            t.add_column(label, values, width=sizing, style=element_style)
+        return t
+
+    @staticmethod
+    def from_array(a, labels=None, **kwargs):
+        """Makes a TextTable from a 2D array of rows, e.g. a list of row lists or
+        a NumPy array.  See from_columns for the other arguments."""
+        if isinstance(a, np.ndarray):
+            a = a.reshape((len(a), -1)) if a.ndim < 2 else a
+            return TextTable.from_columns(list(a.T), labels=labels, **kwargs)
+        rows = [row if isinstance(row, (list, tuple)) else [row] for row in a]
+        ncols = max([len(row) for row in rows], default=0)
+        columns = [
+            [row[j] if j < len(row) else "" for row in rows] for j in range(ncols)
+        ]
+        return TextTable.from_columns(columns, labels=labels, **kwargs)
+
+    @staticmethod
+    def from_csv(filename, header=True, delimiter=",", **kwargs):
+        """Makes a TextTable from a CSV file.  If header is True, the first row
+        is used for the column labels and is drawn as the table header."""
+        with open(filename, "r", newline="") as f:
+            rows = list(csv.reader(f, delimiter=delimiter))
+        labels = None
+        if header and rows:
+            labels, rows = rows[0], rows[1:]
+            kwargs.setdefault("show_header", True)
+        return TextTable.from_array(rows, labels=labels, **kwargs)
@@ -48,7 +48,7 @@ setuptools.setup(
         "Intended Audience :: Developers",
         "License :: OSI Approved :: MIT License",
     ],
-    install_requires=["reportlab", "pdfrw"],
+    install_requires=["reportlab", "pdfrw", "numpy"],
     entry_points={
         "console_scripts": [
             "fourup=pdfdoc.scripts.fourup:main",
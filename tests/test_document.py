@@ -208,3 +208,144 @@ def test_document_watermark():
     doc.page_start_callbacks = [back, p1]
     for section, ctx in doc.iter_doc([1, 2, 3]):
         doc.page_break()
+
+
+def test_document_flow():
+    doc = Document("./tests/testfiles/test_flow.pdf")
+    doc.set_page_size(PAGE_LETTER)
+    doc.style["gutter-width"] = 0.5 * inch
+    doc.set_columns(2)
+    style = {"font-size": 12, "border-outline": True, "border-width": 0.5}
+    table = TableColumn(3 * inch, 1 * inch)
+    table.add_row("Header", TextRect("Part Number", style=style), height=CONTENT_SIZE)
+    for i in range(200):
+        table.add_row(
+            "Row%d" % (i), TextRect("Part %d" % (i), style=style), height=CONTENT_SIZE
+        )
+    row_height = table.get_cell_content("Row0").get_content_size()[1]
+    rows_per_column = int(doc.inset_rect.height / row_height) - 1
+    doc._doc_start()
+    flow = doc.flow(table, header_rows=1)
+    assert flow.row_count == 200
+    assert flow.overflow_count == 0
+    assert flow.fragment_count == math.ceil(200 / rows_per_column)
+    assert doc.page_number == math.ceil(flow.fragment_count / 2)
+    # rows are placed within the current column
+    r = table.get_cell_content("Row199").rect
+    assert r.width == doc.get_current_column_rect().width
+    assert r.left == doc.get_current_column_rect().left
+    doc.end_document()
+
+    doc = Document("./tests/testfiles/test_flow_rows.pdf")
+    doc.set_page_size(PAGE_LETTER)
+    doc._doc_start()
+    rows = (
+        [TextRect("Cell %d,%d" % (i, j), style=style) for j in range(4)]
+        for i in range(100)
+    )
+    flow = doc.flow(rows, header_rows=1)
+    assert flow.row_count == 99
+    assert flow.fragment_count == doc.page_number
+    doc.end_document()
+
+
+def test_document_flow_table_style():
+    # rows are flowed with the row heights, cell order and style of the table
+    doc = Document("./tests/testfiles/test_flow_style.pdf")
+    doc.set_page_size(PAGE_LETTER)
+    doc.set_columns(2)
+    style = {"top-padding": 4, "left-padding": 6, "background-fill": True}
+    style["background-colour"] = (0.9, 0.95, 1.0)
+    table = TableColumn(3 * inch, 2 * inch, style=style)
+    table.add_row("Header", TextRect("Header"), height=0.25)
+    for i in range(60):
+        table.add_row("Row%d" % (i), TextRect("Part %d" % (i)), height=CONTENT_SIZE)
+    table.set_row_order("Row59", 0.5)
+    doc._doc_start()
+    flow = doc.flow(table, header_rows=1)
+    assert flow.row_count == 60
+    assert flow.fragment_count == doc.column
+    header = table.get_cell_content("Header").rect
+    first = table.get_cell_content("Row59").rect
+    second = table.get_cell_content("Row0").rect
+    assert header.height == pytest.approx(0.25 * (2 * inch - 4))
+    assert header.left == pytest.approx(doc.get_current_column_rect().left + 6)
+    assert second.top == pytest.approx(first.bottom)
+    doc.end_document()
+
+    doc = Document("./tests/testfiles/test_flow_grid.pdf")
+    doc.set_page_size(PAGE_LETTER)
+    doc._doc_start()
+    grid = TableGrid()
+    for i in range(400):
+        grid.add_cell("Cell%d" % (i), TextRect("Cell %d" % (i)))
+    flow = doc.flow(grid, header_rows=2)
+    # the header of a grid is its first rows of packed cells
+    assert len(flow.header) == 2
+    assert sum(len(row) for row in flow.header) + flow.row_count < 400
+    doc.end_document()
+
+
+def test_document_dry_run():
+    doc = Document("./tests/testfiles/test_dry_run.pdf", dry_run=True)
+    doc.set_page_size(PAGE_LETTER)
+    doc.page_end_callbacks = [PageNumberCallback(show_in_footer=True)]
+    style = {"font-size": 12, "border-outline": True, "border-width": 0.5}
+    doc._doc_start()
+    assert is_dry_run(doc.c)
+    flow = doc.flow(TextRect("Row %d" % (i), style=style) for i in range(300))
+    doc.end_document()
+    assert not os.path.isfile("./tests/testfiles/test_dry_run.pdf")
+    report = doc.layout_report()
+    assert report["dry_run"]
+    assert report["pages"] == flow.fragment_count
+    assert report["canvas"]["pages"] == report["pages"]
+    ops = report["canvas"]["operation_counts"]
+    assert ops["drawCentredString"] == 300 + report["pages"]
+
+    table = TableRow(2 * inch, 0.5 * inch)
+    table.add_column("Short", TextRect("Fits", style=style), width=0.5)
+    table.add_column("Long", TextRect("Does not fit here", style=style), width=0.5)
+    table.draw_in_canvas(NullCanvas())
+    report = layout_report(table)
+    assert [cell["label"] for cell in report["cells"]] == ["Short", "Long"]
+    assert report["cells"][0]["fits"]
+    assert not report["cells"][1]["fits"]
+    assert not report["fits"]
+
+
+def test_state_canvas():
+    c = StateCanvas(NullCanvas())
+    red, blue = rl_colour((1, 0, 0)), rl_colour((0, 0, 1))
+    assert rl_colour((1, 0, 0)) is red
+    c.setFillColor(red)
+    c.setFillColor(rl_colour((1, 0, 0)))
+    c.saveState()
+    c.setFillColor(blue)
+    c.setLineWidth(2)
+    c.setLineWidth(2)
+    c.restoreState()
+    # the state before saveState is restored
+    c.setFillColor(red)
+    c.setLineWidth(2)
+    assert c.ops["setFillColor"] == 2
+    assert c.ops["setLineWidth"] == 2
+    assert c.suppressed["setFillColor"] == 2
+    assert c.suppressed["setLineWidth"] == 1
+    c.showPage()
+    c.setFillColor(red)
+    assert c.ops["setFillColor"] == 3
+
+    style = {"font-size": 12, "border-outline": True, "border-width": 0.5}
+    table = TableColumn(2 * inch, 8 * inch)
+    for i in range(16):
+        table.add_row("Row%d" % (i), TextRect("Row %d" % (i), style=style))
+    nc = NullCanvas()
+    table.draw_in_canvas(nc)
+    c = StateCanvas(NullCanvas())
+    table.draw_in_canvas(c)
+    report = c.report()
+    assert report["suppressed"] > 0
+    assert report["operations"] + report["suppressed"] == sum(nc.ops.values())
+    assert c.ops["drawCentredString"] == nc.ops["drawCentredString"]
+    assert c.ops["setFont"] < nc.ops["setFont"]
@@ -3,12 +3,16 @@
 import os
 import sys
 import pytest
+import numpy as np
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
+from PIL import Image
 
 from toolbox import *
 from pdfdoc import *
+import pdfdoc.helpers
+from pdfdoc.helpers import get_alpha_table, get_preset_files, _image_pixels
 
 
 _test_dict = {"left-margin": 2, "right-margin": 3, "horz-align": "left"}
@@ -128,3 +132,134 @@ def test_list_presets():
         )
         tr.set_column_width("img", 0.3)
         ld.add_label(tr)
+
+
+def test_imgrect_size_memo():
+    ContentRect.reset_content_size_stats()
+    t1 = ImageRect(10, 2, "./tests/testfiles/test.png")
+    s1 = t1.get_content_size()
+    assert t1.get_content_size() == s1
+    t1.dpi = 150
+    s2 = t1.get_content_size()
+    assert abs(s2[0] - 2 * s1[0]) < 1e-3
+    stats = ContentRect.content_size_stats()["ImageRect"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_transparent_alpha_table():
+    fn = "./tests/testfiles/long.png"
+    clear_alpha_table_cache()
+    clear_image_cache()
+    r1 = Rect(10, 10)
+    r1.move_top_left_to((230, 125))
+    assert not is_rect_in_transparent_region(fn, r1)
+    table = get_alpha_table(fn)
+    assert get_alpha_table(fn) is table
+    # the decoded pixels are not retained in the image pixel cache
+    assert not any(key[0] == fn for key in _image_pixels)
+    # brute force check against the image alpha channel
+    im = Image.open(fn).convert("RGBA")
+    pix = im.load()
+    for x, y in [(0, 10), (230, 125), (430, 230), (100, 60), (300, 20)]:
+        r1.move_top_left_to((x, y))
+        opaque = any(
+            pix[px, py][3] != 0
+            for py in range(max(0, y - 10), min(im.size[1], y))
+            for px in range(x, min(im.size[0], x + 10))
+        )
+        assert is_rect_in_transparent_region(fn, r1) == (not opaque)
+
+
+def test_alpha_table_cache_bytes(tmp_path, monkeypatch):
+    clear_alpha_table_cache()
+    fns = [str(tmp_path / ("image%d.png" % (i))) for i in range(3)]
+    for fn in fns:
+        Image.new("RGBA", (40, 20)).save(fn)
+    table = get_alpha_table(fns[0])
+    assert table.dtype == np.int32
+    assert table.shape == (21, 41)
+    # tables are evicted by their size in memory rather than their count
+    monkeypatch.setattr(pdfdoc.helpers, "ALPHA_TABLE_CACHE_BYTES", 2 * table.nbytes)
+    for fn in fns[1:]:
+        get_alpha_table(fn)
+    assert get_alpha_table(fns[0]) is not table
+    assert get_alpha_table(fns[2]) is get_alpha_table(fns[2])
+
+
+def test_image_info_cache(tmp_path):
+    clear_image_cache()
+    fn = str(tmp_path / "image.png")
+    Image.new("RGB", (40, 20)).save(fn)
+    info = get_image_info(fn)
+    assert info == {"width": 40, "height": 20, "mode": "RGB", "has_alpha": False}
+    assert get_image_info(fn) is info
+    assert get_image_metrics(fn) == (40, 20)
+    assert get_image_info(str(tmp_path / "missing.png")) is None
+    assert get_image_metrics(str(tmp_path / "missing.png")) == (0, 0)
+    pixels = get_image_pixels(fn)
+    assert pixels.shape == (20, 40, 3)
+    assert get_image_pixels(fn) is pixels
+    assert get_image_pixels(fn, "RGBA").shape == (20, 40, 4)
+    assert not is_rect_in_transparent_region(fn, Rect(5, 5))
+
+    # a changed file is detected by its size and modification time
+    Image.new("RGBA", (30, 60)).save(fn)
+    info = get_image_info(fn)
+    assert (info["width"], info["height"], info["has_alpha"]) == (30, 60, True)
+    assert get_image_pixels(fn).shape == (60, 30, 4)
+    r1 = Rect(5, 5)
+    r1.move_top_left_to((0, 10))
+    assert is_rect_in_transparent_region(fn, r1)
+
+
+def test_resampled_image_cache(tmp_path):
+    clear_image_cache()
+    fn = str(tmp_path / "image.png")
+    Image.new("RGBA", (40, 20), (255, 0, 0, 128)).save(fn)
+    image = get_resampled_image(fn, (20, 10))
+    assert image.getSize() == (20, 10)
+    assert get_resampled_image(fn, (20, 10)) is image
+    # the image is decoded once into the pixel cache for every size
+    assert [key[0] for key in _image_pixels] == [fn]
+    pixels = get_image_pixels(fn, "RGBA")
+    assert get_resampled_image(fn, (10, 5)).getSize() == (10, 5)
+    assert get_image_pixels(fn, "RGBA") is pixels
+    assert len(_image_pixels) == 1
+
+
+def test_preset_index():
+    presets = ImageRect.list_presets()
+    assert presets == get_preset_files(".png")
+    assert presets is not ImageRect.list_presets()
+    name = ImageRect.list_presets(as_files=False)[0]
+    assert ImageRect.from_preset(name).filename == presets[0]
+    with pytest.raises(ValueError):
+        ImageRect.from_preset("not_a_preset")
+
+
+def test_imgrect_embed_dpi(tmp_path):
+    clear_image_cache()
+    fn = str(tmp_path / "photo.png")
+    Image.new("RGB", (2000, 1000), (200, 40, 40)).save(fn)
+    fn_full = str(tmp_path / "full.pdf")
+    fn_small = str(tmp_path / "small.pdf")
+    for pdf_file, dpi in [(fn_full, None), (fn_small, 150)]:
+        c = canvas.Canvas(pdf_file, pagesize=(8.5 * inch, 11.0 * inch))
+        set_canvas_image_dpi(c, dpi)
+        for i in range(4):
+            img = ImageRect(2 * inch, 1 * inch, fn)
+            img.rect.move_top_left_to((inch, (10 - 2 * i) * inch))
+            img.draw_in_canvas(c)
+        c.showPage()
+        c.save()
+    assert os.path.getsize(fn_small) < os.path.getsize(fn_full)
+
+    # resampled images are cached by file and pixel size
+    img = ImageRect(2 * inch, 1 * inch, fn, embed_dpi=150)
+    image = img.embedded_image(None, 2000, 1000, 2 * inch, 1 * inch)
+    assert image.getSize() == (300, 150)
+    assert img.embedded_image(None, 2000, 1000, 2 * inch, 1 * inch) is image
+    # images are never upsampled
+    img.embed_dpi = 3000
+    assert img.embedded_image(None, 2000, 1000, 2 * inch, 1 * inch) == fn
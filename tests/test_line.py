@@ -4,8 +4,10 @@ import os
 import sys
 import pytest
 
+import numpy as np
+
 from toolbox import *
-from pdfdoc import StyledLine, IN2PTS
+from pdfdoc import StyledLine, IN2PTS, NullCanvas, simplify_polyline
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch, mm
 
@@ -136,3 +138,77 @@ def test_grid():
     )
     c.showPage()
     c.save()
+
+
+def test_grid_polylines_single_path():
+    style = {
+        "line-width": 0.2 * mm,
+        "line-colour": "#505050",
+        "grid-line-width": 0.25 * mm,
+        "grid-line-colour": "#400040",
+        "grid-dash": [1, 2, 1, 0],
+    }
+    c = NullCanvas()
+    StyledLine.draw_grid(c, 0, 0, 2, 2, 200, 200, style=style)
+    assert c.ops["beginPath"] == 1
+    assert c.ops["drawPath"] == 1
+
+    c = canvas.Canvas(
+        "./tests/testfiles/test_polylines.pdf",
+        pagesize=(8.5 * inch, 11.0 * inch),
+    )
+    line = StyledLine(style=style)
+    polylines = [
+        IN2PTS([(1, 1 + 0.2 * i), (3, 1.5 + 0.2 * i), (5, 1 + 0.2 * i)])
+        for i in range(20)
+    ]
+    polylines.append([(0, 0)])
+    line.draw_polylines(c, polylines)
+    c.showPage()
+    c.save()
+
+    nc = NullCanvas()
+    line.draw_polylines(nc, polylines)
+    assert nc.ops["beginPath"] == 1
+    assert nc.ops["drawPath"] == 1
+    assert nc.ops["setStrokeColor"] == 1
+
+
+def test_trace_simplified():
+    x = np.linspace(1, 7.5, 50000)
+    y = 5 + np.sin(x * 3) + 0.0001 * np.cos(x * 5000)
+    trace = np.column_stack((x, y)) * 72
+    tolerance = 72 / 300
+    pts = simplify_polyline(trace, tolerance)
+    assert len(pts) < len(trace) // 50
+    assert np.allclose(pts[0], trace[0]) and np.allclose(pts[-1], trace[-1])
+    # every original point lies close to the simplified polyline
+    idx = np.clip(np.searchsorted(pts[:, 0], trace[:, 0]), 1, len(pts) - 1)
+    p0, d = pts[idx - 1], pts[idx] - pts[idx - 1]
+    rel = trace - p0
+    dist = np.abs(rel[:, 0] * d[:, 1] - rel[:, 1] * d[:, 0]) / np.hypot(*d.T)
+    assert np.max(dist) < 2 * tolerance
+    assert len(simplify_polyline(trace[:2], tolerance)) == 2
+    assert len(simplify_polyline(trace, None)) == len(trace)
+
+    c = canvas.Canvas(
+        "./tests/testfiles/test_trace.pdf",
+        pagesize=(8.5 * inch, 11.0 * inch),
+    )
+    line = StyledLine(style={"line-width": 0.2 * mm, "line-colour": "#202070"})
+    line.draw_trace(c, trace, tolerance=tolerance, arrow1=True)
+    line.draw_trace(c, trace - (0, 144))
+    c.showPage()
+    c.save()
+
+
+def test_trace_number_format():
+    from reportlab.lib.rl_accel import fp_str
+    from pdfdoc.graphics.line import _fp_line_code
+
+    values = [0.4480918, 22462900.5, -0.00001, 1e-8, 1.0, -0.5, 99.99999, 1e7]
+    values += list(np.random.default_rng(1).normal(0, 1000, 2000))
+    pts = np.array(values).reshape(-1, 2)
+    expected = " ".join("%s l" % fp_str(x, y) for x, y in pts.tolist())
+    assert _fp_line_code(pts) == expected
+    assert "e" not in _fp_line_code(pts)
@@ -3,6 +3,8 @@
 import os
 import sys
 import pytest
+import fitz
+import numpy as np
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
@@ -67,3 +69,84 @@ def test_patternrect_border():
     )
     c.showPage()
     c.save()
+
+
+def test_patternrect_batched_paths():
+    # every shape of a pattern is emitted in a single path
+    c = NullCanvas()
+    t1 = PatternRect(6 * inch, 0.5 * inch, pattern_width=9, pattern_slant=4)
+    t1.draw_in_canvas(c)
+    assert c.ops["beginPath"] == 1
+    assert c.ops["drawPath"] == 1
+
+    c = NullCanvas()
+    t2 = PatternRect(5 * inch, 0.5 * inch, pattern="squares", pattern_width=4)
+    t2.draw_in_canvas(c)
+    assert c.ops["beginPath"] == 1
+    assert c.ops["drawPath"] == 1
+
+    c = NullCanvas()
+    PatternRect.thick_bordered_rect(
+        c, 0.5 * inch, 10.5 * inch, 7.5 * inch, 10 * inch, 0.5 * inch
+    )
+    assert c.ops["drawPath"] == 4
+
+
+def test_patternrect_tiled():
+    c = canvas.Canvas(
+        "./tests/testfiles/test_patternrect_tiled.pdf", pagesize=CANVAS_LETTER
+    )
+    for _ in range(3):
+        PatternRect.thick_bordered_rect(
+            c, 0.5 * inch, 10.5 * inch, 7.5 * inch, 10 * inch, 0.5 * inch, tiled=True
+        )
+        c.showPage()
+    t1 = PatternRect(5 * inch, 0.5 * inch, pattern="squares", tiled=True)
+    t1.pattern_width = 8
+    t1.top_left = (1 * inch, 5 * inch)
+    t1.draw_in_canvas(c)
+    c.showPage()
+    c.save()
+    # one pattern for each tile shape and one fill form for each rect size
+    # are shared by every page of the document
+    assert len(c._doc._pdfdoc_patterns) == 2
+    assert len(c._doc._pdfdoc_pattern_fills) == 3
+
+    c = NullCanvas()
+    PatternRect.thick_bordered_rect(
+        c, 0.5 * inch, 10.5 * inch, 7.5 * inch, 10 * inch, 0.5 * inch, tiled=True
+    )
+    assert c.ops["doForm"] == 4
+    assert c.ops["drawPath"] == 0
+
+
+def _render_pattern_pixels(fn, tiled):
+    c = canvas.Canvas(fn, pagesize=(400, 200))
+    for i, border_width in enumerate((0, 1, 3)):
+        p = PatternRect(360, 50, style={"border-width": border_width}, tiled=tiled)
+        p.top_left = 20, 190 - i * 60
+        p.draw_in_canvas(c)
+    c.showPage()
+    c.save()
+    pix = fitz.open(fn)[0].get_pixmap(dpi=144)
+    pixels = np.frombuffer(pix.samples, dtype=np.uint8)
+    return pixels.reshape(pix.h, pix.w, pix.n).astype(int)
+
+
+def test_patternrect_tiled_pixels():
+    # each tiled pattern cell sets its own line width and keeps the part of
+    # its strokes which overlap the neighbouring cells, so apart from
+    # anti-aliasing it renders like the untiled pattern inside each rect
+    # (strokes beyond the rect edges are clipped by the tiled pattern)
+    untiled = _render_pattern_pixels(
+        "./tests/testfiles/test_patternrect_untiled_pixels.pdf", False
+    )
+    tiled = _render_pattern_pixels(
+        "./tests/testfiles/test_patternrect_tiled_pixels.pdf", True
+    )
+    diff = np.abs(untiled - tiled).max(axis=2)
+    for i in range(3):
+        # 2 pixels per point, inset by 3 points from each rect edge
+        top = 2 * (10 + i * 60)
+        inner = diff[top + 6 : top + 94, 46:754]
+        assert np.count_nonzero(inner > 64) < 0.02 * inner.size
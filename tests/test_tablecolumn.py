@@ -3,6 +3,7 @@
 import os
 import sys
 import pytest
+import tracemalloc
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
@@ -117,3 +118,70 @@ def test_tableimbedded():
     tr.draw_in_canvas(c)
     c.showPage()
     c.save()
+
+
+def _table_bytes_per_cell(n):
+    tracemalloc.start()
+    col = TableColumn()
+    for i in range(n):
+        col.add_row("Row%d" % (i), TextRect("Cell %d" % (i)))
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / n, col
+
+
+def test_tablecolumn_memory():
+    per_cell, col = _table_bytes_per_cell(2000)
+    print("TableColumn memory: %.0f bytes per TextRect cell" % (per_cell))
+    cell = col.cells[0]
+    assert not hasattr(cell, "__dict__")
+    cell = TableCell("Cell", TextRect("Text"), visible=False)
+    assert not cell.visible
+    # only style attributes of an object are mirrored into its style
+    t = col.get_cell_content("Row0")
+    assert "text" not in t.style.attr
+    assert "rect" not in t.style.attr
+    assert len(t.style.attr) == len(DocStyle().attr)
+    t.font_size = 20
+    assert t.style["font-size"] == 20
+    assert t.rect_snapshot is None
+
+
+def test_tablecolumn_auto_fit():
+    parts = [
+        ("1", "M3 nut", "Zinc"),
+        ("12", "M3 x 8 socket head cap screw with a nylon patch", "Stainless"),
+        ("100", "Bracket", ""),
+    ]
+    text_style = {"left-padding": 0.05 * inch, "right-padding": 0.05 * inch}
+    col = TableColumn(6 * inch, 3 * inch)
+    for i, (qty, desc, notes) in enumerate(parts):
+        row = TableRow()
+        row.add_column("Qty", TextRect(qty, style=text_style))
+        row.add_column("Desc", TextRect(desc, style=text_style, split_lines=True))
+        row.add_column("Notes", TextRect(notes, style=text_style), width=0.2)
+        col.add_row("Row%d" % (i), row)
+    mins, maxs = col.get_column_width_bounds()
+    qty = TextRect("100", style=text_style).get_content_size()[0]
+    desc = TextRect(parts[1][1], style=text_style).get_content_size()[0]
+    assert abs(maxs[0] - qty) < 1e-3
+    assert abs(mins[0] - qty) < 1e-3
+    assert abs(maxs[1] - desc) < 1e-3
+    assert mins[1] < maxs[1]
+
+    widths = col.auto_fit_columns()
+    assert abs(widths.sum() - 6 * inch) < 1e-3
+    assert abs(widths[2] - 0.2 * 6 * inch) < 1e-3
+    assert widths[0] >= qty
+    assert widths[1] >= mins[1]
+    row = col.get_cell_content("Row1")
+    assert abs(row["Qty"].width - widths[0] / (6 * inch)) < 1e-6
+    assert row["Notes"].width == 0.2
+    col.draw_in_canvas(NullCanvas())
+    assert not any(r.content.has_clipped_cells() for r in col.iter_cells())
+
+    # changed content is fitted again from the original column specs
+    col.get_cell_content("Row2").get_cell_content("Qty").text = "10000000"
+    widths2 = col.auto_fit_columns()
+    assert widths2[0] > widths[0]
+    assert abs(widths2.sum() - 6 * inch) < 1e-3
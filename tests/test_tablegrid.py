@@ -4,6 +4,7 @@ import os
 import sys
 import pytest
 import random
+import time
 
 from toolbox import *
 from pdfdoc import *
@@ -230,3 +231,85 @@ def test_tablegrid_gutters():
     tablegrid_col_test(
         "./tests/testfiles/test_tablegrid_gutters.pdf", "Normal", {"strategy": "none"}
     )
+
+
+def test_tablegrid_refill_selection():
+    # auto refill lays out the fill direction first and only swaps if the
+    # shape is bad, exactly as a direct use of Rect.layout_rects would
+    layout_rects = Rect.layout_rects
+    calls = []
+
+    def recorded_layout_rects(rects, bound, **kwargs):
+        calls.append((rects, bound.copy(), dict(kwargs)))
+        return layout_rects(rects, bound, **kwargs)
+
+    rng = random.Random(38)
+    Rect.layout_rects = staticmethod(recorded_layout_rects)
+    try:
+        for _ in range(200):
+            fill_dir = rng.choice(["row-wise", "column-wise"])
+            tg = TableGrid(
+                rng.uniform(1, 8) * inch,
+                rng.uniform(1, 8) * inch,
+                fill_dir=fill_dir,
+                auto_refill=True,
+                auto_adjust=rng.choice([True, False]),
+                align_cols=rng.choice([True, False]),
+            )
+            for i in range(rng.randint(2, 14)):
+                w, h = rng.uniform(0.2, 3) * inch, rng.uniform(0.2, 3) * inch
+                tg.add_cell("Cell%d" % (i), ContentRect(w, h))
+            calls.clear()
+            tg.compute_cell_sizes()
+            assert 1 <= len(calls) <= 2
+            rects, bound, kwargs = calls[0]
+            assert kwargs["row_wise"] == (fill_dir == "row-wise")
+            # every layout shares the same measured cell sizes
+            assert all(call[0] is rects for call in calls)
+            expected = layout_rects(rects, bound, **kwargs)
+            if not tg.is_shape_good(expected):
+                kwargs["row_wise"] = not kwargs["row_wise"]
+                expected = layout_rects(rects, bound, **kwargs)
+            else:
+                assert len(calls) == 1
+            placed = [cell.content.rect for cell in tg.iter_cells()]
+            for rect, exp in zip(placed, expected):
+                assert rect.left == pytest.approx(exp.left)
+                assert rect.top == pytest.approx(exp.top)
+                assert rect.width == pytest.approx(exp.width)
+                assert rect.height == pytest.approx(exp.height)
+    finally:
+        Rect.layout_rects = staticmethod(layout_rects)
+
+
+def test_tablegrid_1000_cell_refill():
+    # a refill of a 1,000 cell grid lays out twice but measures each cell
+    # content only once (as it also did before the refill was restructured)
+    measured = []
+
+    class MeasuredRect(ContentRect):
+        def get_content_size(self, with_padding=True):
+            measured.append(self)
+            return super().get_content_size(with_padding=with_padding)
+
+    layout_rects = Rect.layout_rects
+    calls = []
+
+    def recorded_layout_rects(rects, bound, **kwargs):
+        calls.append(kwargs["row_wise"])
+        return layout_rects(rects, bound, **kwargs)
+
+    tg = TableGrid(10 * inch, 4 * inch, fill_dir="column-wise", auto_refill=True)
+    for i in range(1000):
+        tg.add_cell("Cell%d" % (i), MeasuredRect(0.2 * inch, 0.1 * inch))
+    Rect.layout_rects = staticmethod(recorded_layout_rects)
+    try:
+        t0 = time.perf_counter()
+        tg.compute_cell_sizes()
+        elapsed = time.perf_counter() - t0
+    finally:
+        Rect.layout_rects = staticmethod(layout_rects)
+    print("TableGrid 1000 cell refill: %.1f ms" % (1000 * elapsed))
+    assert calls == [False, True]
+    assert len(measured) == 1000
+    assert len(set(id(cell) for cell in measured)) == 1000
@@ -3,6 +3,7 @@
 import os
 import sys
 import pytest
+import json
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
@@ -109,3 +110,328 @@ def test_table_from_array():
 
     c.showPage()
     c.save()
+
+
+def test_table_dirty_flags():
+    t1 = TextRect("Cell 1")
+    t2 = TextRect("Cell 2")
+    row = TableRow(4 * inch, 1 * inch)
+    row.add_column("Cell1", t1, width=CONTENT_SIZE)
+    row.add_column("Cell2", t2)
+    col = TableColumn(4 * inch, 2 * inch)
+    col.add_row("Row1", row)
+    assert t1.layout_parent is row
+    assert row.layout_parent is col
+    assert row.is_dirty
+    assert col.is_dirty
+
+    # a child's first layout re-sizes its cells and so flags its parent
+    col.compute_cell_sizes("height")
+    row.compute_cell_sizes("width")
+    assert not row.is_dirty
+    assert col.is_dirty
+    col.compute_cell_sizes("height")
+    assert not row.is_dirty
+    assert not col.is_dirty
+
+    # changes to content, style and cell attributes propagate upwards
+    t1.text = "A longer cell text"
+    assert row.is_dirty
+    assert col.is_dirty
+    row.compute_cell_sizes("width")
+    col.compute_cell_sizes("height")
+    row.compute_cell_sizes("width")
+    assert not row.is_dirty
+    assert not col.is_dirty
+    t2.style["font-size"] = 24
+    assert row.is_dirty
+    assert col.is_dirty
+    row.compute_cell_sizes("width")
+    col.compute_cell_sizes("height")
+    row.compute_cell_sizes("width")
+    assert not col.is_dirty
+    row.set_cell_visible("Cell2", False)
+    assert row.is_dirty
+    assert col.is_dirty
+    row.set_cell_visible("Cell2", True)
+    row.compute_cell_sizes("width")
+    col.compute_cell_sizes("height")
+    row.compute_cell_sizes("width")
+
+    # moving a clean container translates its cells without a new layout
+    x0, y0 = t1.rect.left, t1.rect.top
+    col.rect.move_top_left_to((col.rect.left + 72, col.rect.top - 36))
+    col.compute_cell_sizes("height")
+    row.compute_cell_sizes("width")
+    assert not col.is_dirty
+    assert not row.is_dirty
+    assert abs(t1.rect.left - (x0 + 72)) < 1e-3
+    assert abs(t1.rect.top - (y0 - 36)) < 1e-3
+
+
+def test_table_cell_index():
+    tv = TableVector(4 * inch, 4 * inch)
+    for i in range(8):
+        for j in range(8):
+            cell = ContentRect(0.5 * inch, 0.5 * inch)
+            cell.top_left = (i * 0.5 * inch, 4 * inch - j * 0.5 * inch)
+            tv.add_cell("Cell%d%d" % (i, j), cell)
+    tv.top_left = (0, 4 * inch)
+    assert not tv.has_overlapped_cells()
+    assert not tv.has_clipped_cells()
+    index = tv.get_cell_index()
+    assert len(index) == 64
+    assert tv.get_cell_index() is index
+    tv.get_cell_content("Cell00").top_left = (0.25 * inch, 3.75 * inch)
+    assert tv.get_cell_index() is not index
+    assert tv.has_overlapped_cells()
+    assert tv.get_overlapped_cells() == ["Cell00", "Cell01", "Cell10", "Cell11"]
+    assert tv.is_cell_overlapped("Cell11")
+    assert not tv.is_cell_overlapped("Cell22")
+    tv.get_cell_content("Cell77").top_left = (3.75 * inch, 0.75 * inch)
+    assert tv.get_clipped_cells() == ["Cell77"]
+    assert tv.is_cell_clipped("Cell77")
+    tv.set_cell_visible("Cell00", False)
+    assert tv.get_overlapped_cells() == ["Cell76", "Cell77"]
+
+
+def _snapshot_table(texts):
+    col = TableColumn(4 * inch, 3 * inch)
+    for i, (t1, t2) in enumerate(texts):
+        row = TableRow(4 * inch, 0.5 * inch)
+        row.add_column("Cell1", TextRect(t1), width=CONTENT_SIZE)
+        row.add_column("Cell2", TextRect(t2))
+        col.add_row("Row%d" % (i), row)
+    col.top_left = (1 * inch, 10 * inch)
+    return col
+
+
+def _leaf_rects(col):
+    return [
+        (c.content.rect.left, c.content.rect.top, c.content.rect.width)
+        for row in col.iter_cells()
+        for c in row.content.iter_cells()
+    ]
+
+
+def test_table_layout_snapshot():
+    texts = [("Part %d" % (i), "Description %d" % (i)) for i in range(4)]
+    col = _snapshot_table(texts)
+    # the first layout re-sizes the row cells which flags the column for
+    # another pass, only settled layouts are kept in a snapshot
+    col.draw_in_canvas(NullCanvas())
+    assert col.is_dirty
+    col.draw_in_canvas(NullCanvas())
+    assert not col.is_dirty
+    geometry = _leaf_rects(col)
+    fn = "./tests/testfiles/test_layout_snapshot.json"
+    snapshot = save_layout_snapshot(col, fn)
+
+    # an identical tree restores every container layout
+    col = _snapshot_table(texts)
+    assert layout_fingerprint(col) == snapshot["structure"]
+    assert load_layout_snapshot(col, fn) == 5
+    assert not col.is_dirty
+    assert all(not r.content.is_dirty for r in col.iter_cells())
+    col.draw_in_canvas(NullCanvas())
+    assert _leaf_rects(col) == geometry
+
+    # only the subtree with changed content is laid out again
+    texts[2] = ("Part 2", "A much longer description")
+    col = _snapshot_table(texts)
+    assert load_layout_snapshot(col, snapshot) == 3
+    assert col.is_dirty
+    assert col.get_cell_content("Row2").is_dirty
+    assert not col.get_cell_content("Row1").is_dirty
+
+    # a different style is a different structure
+    col = _snapshot_table(texts)
+    col.get_cell_content("Row0").style["left-padding"] = 0.1 * inch
+    assert not layout_fingerprint(col) == snapshot["structure"]
+    assert load_layout_snapshot(col, snapshot) == 0
+
+
+def test_table_profiler():
+    col = _snapshot_table([("Part %d" % (i), "Description %d" % (i)) for i in range(3)])
+    draw_in_canvas = TableColumn.draw_in_canvas
+    with LayoutProfiler() as profiler:
+        assert not TableColumn.draw_in_canvas is draw_in_canvas
+        col.draw_in_canvas(NullCanvas())
+    assert TableColumn.draw_in_canvas is draw_in_canvas
+    assert TextRect.draw_in_canvas is TextRect.__dict__["draw_in_canvas"]
+
+    nodes = list(profiler.root.children.values())
+    assert len(nodes) == 1
+    draw = nodes[0]
+    assert draw.name == "%r.draw_in_canvas" % (col)
+    assert draw.calls == 1
+    assert draw.inclusive <= profiler.root.inclusive
+    assert 0 <= draw.exclusive <= draw.inclusive
+    methods = {node.method for node, _ in profiler.root.iter_nodes()}
+    assert methods == {None, "draw_in_canvas", "get_content_size", "compute_cell_sizes"}
+    # each row is drawn once by the column
+    rows = [n for n in draw.children.values() if n.label.startswith("TableRow")]
+    assert sum(n.calls for n in rows if n.method == "draw_in_canvas") == 3
+    assert "TextRect" in profiler.report()
+
+    d = json.loads(profiler.to_json())
+    assert d["children"][0]["name"] == draw.name
+    stacks = profiler.folded_stacks().splitlines()
+    assert all(line.startswith("profile") for line in stacks)
+    assert any(len(line.split()[0].split(";")) > 3 for line in stacks)
+
+
+def test_table_viewport_culling():
+    col = TableColumn(4 * inch, 4 * inch)
+    for i in range(8):
+        row = TableRow(4 * inch, 0.5 * inch)
+        for j in range(8):
+            row.add_column("Cell%d" % (j), TextRect("%d,%d" % (i, j)))
+        col.add_row("Row%d" % (i), row)
+    col.top_left = (0, 4 * inch)
+
+    c = NullCanvas()
+    col.draw_in_canvas(c)
+    assert c.ops["drawCentredString"] == 64
+    assert get_culled_count(c) == 0
+
+    # only the top left quarter of the table is drawn
+    viewport = Rect(1.9 * inch, 1.9 * inch)
+    viewport.move_top_left_to((0, 4 * inch))
+    c = NullCanvas()
+    set_canvas_viewport(c, viewport)
+    col.draw_in_canvas(c)
+    assert c.ops["drawCentredString"] == 16
+    # 4 rows and 4 cells in each of the drawn rows are culled
+    assert get_culled_count(c) == 4 + 4 * 4
+    assert c.report()["culled"] == 20
+
+    # a table outside the viewport is not laid out or drawn at all
+    c = NullCanvas()
+    set_canvas_viewport(c, viewport)
+    col.top_left = (5 * inch, 4 * inch)
+    col.draw_in_canvas(c)
+    assert sum(c.ops.values()) == 0
+    assert get_culled_count(c) == 1
+    set_canvas_viewport(c, None)
+    col.draw_in_canvas(c)
+    assert c.ops["drawCentredString"] == 64
+
+
+def test_rectarray():
+    rects = [Rect(1, 2), Rect(3, 1), Rect(2, 2)]
+    ra = RectArray.from_rects(rects)
+    assert len(ra) == 3
+    assert list(ra.width) == [1, 3, 2]
+    assert list(ra.height) == [2, 1, 2]
+
+    ra.stack(Rect(10, 10), "width")
+    assert list(ra.left) == [-5, -4, -1]
+    assert list(ra.top) == [5, 5, 5]
+    b = ra.bounding_rect()
+    assert (b.left, b.top, b.right, b.bottom) == (-5, 5, 1, 3)
+    ra.stack(Rect(10, 10), "height", reverse=True)
+    assert list(ra.top) == [0, -2, -3]
+    assert list(ra.bottom) == [-2, -3, -5]
+
+    ra.translate(5, 5).inset(0.25)
+    assert list(ra.left) == [0.25] * 3
+    assert list(ra.width) == [0.5, 2.5, 1.5]
+    m = ra.overlap_matrix()
+    assert m.shape == (3, 3)
+    assert not m[0, 0]
+    assert not m[0, 1] and not m[1, 2]
+
+    ra.align(Rect(4, 4), "right", "top")
+    assert list(ra.right) == [2] * 3
+    assert list(ra.top) == [2] * 3
+    assert ra.overlap_matrix()[0, 1] and ra.overlap_matrix()[2, 1]
+    inter = ra.intersect(Rect(2, 2))
+    assert list(inter.width) == [0, 1.5, 0.5]
+    assert list(inter.height) == [0.5, 0, 0.5]
+
+    ra.write_to(rects)
+    assert (rects[1].left, rects[1].top) == (-0.5, 2)
+    assert rects[1].width == 2.5
+    assert RectArray.from_rects([]).bounding_rect().width == 0
+
+
+def test_table_rectarray_layout():
+    col = TableColumn(4 * inch, 4 * inch)
+    col.style.set_attr("vert-align", "bottom")
+    for i in range(5):
+        col.add_row("Row%d" % (i), TextRect("Row %d" % (i)), height=0.1 * (i + 1))
+    col.top_left = (1 * inch, 5 * inch)
+    col.compute_cell_sizes("height")
+    rects = [cell.content.rect for cell in col.iter_cells()]
+    # rows are stacked upwards from the bottom edge without gaps
+    assert abs(rects[-1].bottom - 1 * inch) < 1e-6
+    for r0, r1 in zip(rects, rects[1:]):
+        assert abs(r0.bottom - r1.top) < 1e-6
+    for i, r in enumerate(rects):
+        assert abs(r.height - 0.1 * (i + 1) * 4 * inch) < 1e-6
+        assert abs(r.width - 4 * inch) < 1e-6
+        assert r.left == 1 * inch
+
+
+def test_static_content_forms():
+    c = canvas.Canvas(
+        "./tests/testfiles/test_static_content.pdf", pagesize=CANVAS_LETTER
+    )
+    drawn = []
+    for i in range(20):
+        row = TableRow(2 * inch, 0.5 * inch)
+        stripe = PatternRect(0.5 * inch, 0.5 * inch, is_static=True)
+        if i >= 15:
+            stripe.foreground_colour = (0, 0, 1)
+        row.add_column("stripe", stripe, width=0.25)
+        row.add_column("text", TextRect("Label %d" % (i)), width=0.75)
+        row.top_left = (1 * inch, 10 * inch - i * 0.5 * inch)
+        row.draw_in_canvas(c)
+        drawn.append(stripe)
+    c.showPage()
+    c.save()
+    # one form for each differently drawn stripe is shared by every row
+    forms = c._doc._pdfdoc_static_forms
+    assert len(forms) == 2
+
+    # static containers are cached with all of their children
+    c = canvas.Canvas(
+        "./tests/testfiles/test_static_content.pdf", pagesize=CANVAS_LETTER
+    )
+    for i in range(5):
+        col = TableColumn(2 * inch, 1 * inch, is_static=True)
+        col.add_row("title", TextRect("Title"))
+        col.add_row("body", PatternRect(2 * inch, 0.5 * inch))
+        col.top_left = (1 * inch, 10 * inch - i * inch)
+        col.draw_in_canvas(c)
+    c.showPage()
+    c.save()
+    assert len(c._doc._pdfdoc_static_forms) == 1
+
+    # dry-run canvases always draw static content
+    c = NullCanvas()
+    for stripe in drawn:
+        stripe.draw_in_canvas(c)
+    assert c.ops["doForm"] == 0
+    assert c.ops["drawPath"] == 20
+
+
+def test_static_content_nested_forms():
+    # static children of static containers define their own forms while the
+    # form of their container is being drawn
+    c = canvas.Canvas(
+        "./tests/testfiles/test_static_nested.pdf", pagesize=CANVAS_LETTER
+    )
+    for i in range(4):
+        col = TableColumn(2 * inch, 1 * inch, is_static=True)
+        col.add_row("title", TextRect("Title", is_static=True))
+        col.add_row("body", TextRect("Body %d" % (i % 2), is_static=True))
+        col.top_left = (1 * inch, 10 * inch - i * 1.5 * inch)
+        col.draw_in_canvas(c)
+    c.showPage()
+    c.save()
+    forms = c._doc._pdfdoc_static_forms
+    # two containers, one title and two bodies
+    assert len(forms) == 5
+    assert len(set(name for name, _, _ in forms.values())) == 5
@@ -243,3 +243,58 @@ def test_textrect_render():
 
     c.showPage()
     c.save()
+
+
+def test_textrect_size_memo():
+    ContentRect.reset_content_size_stats()
+    t1 = TextRect(3 * inch, 1 * inch, "Memo Test", _test_dict)
+    s1 = t1.get_content_size()
+    assert t1.get_content_size() == s1
+    stats = ContentRect.content_size_stats()["TextRect"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    t1.text = "Longer Memo Test"
+    s2 = t1.get_content_size()
+    assert s2[0] > s1[0]
+    t1.style["font-size"] = 2 * t1.font_size
+    s3 = t1.get_content_size()
+    assert s3[1] > s2[1]
+    stats = ContentRect.content_size_stats()["TextRect"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    ContentRect.memoize_content_size = False
+    assert t1.get_content_size() == s3
+    ContentRect.memoize_content_size = True
+    assert ContentRect.content_size_stats()["TextRect"]["hits"] == 1
+
+
+def test_textrect_size_memo_fit_flags():
+    def uncached(t):
+        ContentRect.memoize_content_size = False
+        try:
+            return t.get_content_size()
+        finally:
+            ContentRect.memoize_content_size = True
+
+    text = "A long line of text which is fitted to a narrow rect"
+    flags = ("split_lines", "shrink_to_fit", "expand_to_fit")
+    for flag in flags:
+        for other in flags:
+            if other == flag:
+                continue
+            # toggle each flag while another fit flag is already active
+            t = TextRect(1.5 * inch, 0.5 * inch, text, _test_dict)
+            for f in flags:
+                setattr(t, f, f == other)
+            assert t.get_content_size() == uncached(t)
+            setattr(t, flag, True)
+            assert t.get_content_size() == uncached(t)
+            setattr(t, flag, False)
+            assert t.get_content_size() == uncached(t)
+
+    # the rect height is part of the key when the text is fitted
+    t = TextRect(1.5 * inch, 0.5 * inch, text, _test_dict)
+    t.shrink_to_fit = True
+    t.get_content_size()
+    t.rect.set_size(1.5 * inch, 0.25 * inch)
+    assert t.get_content_size() == uncached(t)
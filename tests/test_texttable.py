@@ -0,0 +1,146 @@
+# Sample Test passing with nose and pytest
+
+import os
+import sys
+import pytest
+
+import numpy as np
+
+from toolbox import *
+from pdfdoc import *
+from reportlab.pdfgen import canvas
+from reportlab.lib.units import inch
+
+_cell_style = {
+    "font-size": 10,
+    "border-outline": True,
+    "border-width": 0.5,
+    "left-padding": 0.05 * inch,
+    "right-padding": 0.05 * inch,
+    "horz-align": "left",
+}
+
+
+def test_texttable_array():
+    a = np.arange(200 * 4).reshape((200, 4)) * 1000
+    t = TextTable.from_array(a, labels=["A", "B", "C"], element_style=_cell_style)
+    assert len(t) == 200
+    assert t.column_count == 4
+    assert t.labels == ["A", "B", "C", "Column4"]
+    assert t.get_row(1) == ["4000", "5000", "6000", "7000"]
+    assert t.get_cell_text(199, "C") == "798000"
+
+    # the same columns as a TableRow of CONTENT_SIZE text cells
+    row = TableRow()
+    for text in t.get_row(199):
+        row.add_column(TextRect(text, style=_cell_style), width=CONTENT_SIZE)
+    w, h = t.get_content_size()
+    rw, rh = row.get_content_size()
+    assert abs(w - rw) < 1e-3
+    assert abs(h - 200 * rh) < 1e-3
+
+    # rows which do not fit are left for the next page
+    c = canvas.Canvas("./tests/testfiles/test_texttable.pdf", pagesize=CANVAS_LETTER)
+    t.fit_to_contents = False
+    t.show_header = True
+    t.set_header_style({"font": "DIN-Bold", "background-fill": True})
+    t.size = 6 * inch, 9 * inch
+    t.top_left = 1 * inch, 10 * inch
+    drawn = []
+    while t.first_row < len(t):
+        t.draw_in_canvas(c)
+        drawn.append(t.drawn_rows)
+        t.first_row += t.drawn_rows
+        c.showPage()
+    c.save()
+    assert len(drawn) > 1
+    assert sum(drawn) == 200
+    assert drawn[0] == drawn[1]
+
+
+def test_texttable_sizing():
+    t = TextTable(6 * inch, 3 * inch, style={"left-padding": 0.1 * inch})
+    t.add_column("Qty", [1, 2, 10], width=CONTENT_SIZE, style=_cell_style)
+    t.add_column("Part", ["M3 nut", "M3 washer", "M3x8 bolt"], style=_cell_style)
+    t.add_column("Notes", ["", "", "Stainless"], width=0.25, style=_cell_style)
+    widths, heights, header = t.compute_cell_sizes()
+    qty = TextRect("10", style=_cell_style).get_content_size()
+    assert abs(widths[0] - qty[0]) < 1e-3
+    assert abs(widths[2] - 0.25 * 5.9 * inch) < 1e-3
+    assert abs(sum(widths) - 5.9 * inch) < 1e-3
+    assert abs(heights[0] - qty[1]) < 1e-3
+    assert header == 0
+
+    # AUTO_SIZE rows share the table height
+    t.row_height = AUTO_SIZE
+    _, heights, _ = t.compute_cell_sizes()
+    assert abs(heights[0] - 1 * inch) < 1e-3
+    assert len(t.visible_rows()) == 3
+
+    # column styles are shared by every cell and invalidate the layout
+    t.set_column_style("Part", {"font-size": 24})
+    assert t.is_dirty
+    t.row_height = CONTENT_SIZE
+    _, heights, _ = t.compute_cell_sizes()
+    assert heights[0] > qty[1]
+    assert not t.is_dirty
+    t.set_cell_text(2, "Part", "M3x8 socket head cap screw")
+    assert t.is_dirty
+    widths2, _, _ = t.compute_cell_sizes()
+    assert abs(widths2[1] - widths[1]) < 1e-3
+
+
+def test_texttable_csv():
+    fn = "./tests/testfiles/test_texttable.csv"
+    with open(fn, "w") as f:
+        f.write("Part,Description\n1001,Bracket\n1002,Hinge pin\n1003\n")
+    t = TextTable.from_csv(fn, element_style=_cell_style)
+    os.remove(fn)
+    assert t.labels == ["Part", "Description"]
+    assert t.show_header
+    assert len(t) == 3
+    assert t.get_row(2) == ["1003", ""]
+    w, h = t.get_content_size()
+    assert h > 0
+    t.top_left = 1 * inch, 10 * inch
+    c = NullCanvas()
+    t.draw_in_canvas(c)
+    assert t.drawn_rows == 3
+    assert abs(t.rect.width - w) < 1e-3
+
+
+def test_texttable_viewport():
+    t = TextTable.from_array(np.arange(40).reshape((20, 2)), fit_to_contents=False)
+    t.size = 4 * inch, 10 * inch
+    t.top_left = 1 * inch, 10 * inch
+    c = NullCanvas()
+    t.draw_in_canvas(c)
+    drawn = c.ops["drawCentredString"]
+    assert drawn == 40
+
+    viewport = Rect(8.5 * inch, 2 * inch)
+    viewport.move_top_left_to((0, 11 * inch))
+    c = NullCanvas()
+    set_canvas_viewport(c, viewport)
+    t.draw_in_canvas(c)
+    assert t.drawn_rows == 20
+    assert 0 < c.ops["drawCentredString"] < drawn
+    assert c.ops["drawCentredString"] == 2 * (20 - get_culled_count(c))
+
+
+def test_texttable_split_lines_width():
+    style = {**_cell_style, "split-lines": True}
+    text = "M3 x 8 socket head cap screw with a nylon patch"
+    t = TextTable(6 * inch, 3 * inch, show_debug_rects=True)
+    t.add_column("Part", [text, "M3 nut"], style=style)
+    # cells measured without a width follow the width of the column rect
+    tr = t.column_rects[0]
+    for width in (1 * inch, 4 * inch, 1 * inch):
+        tr.rect.set_size(width, tr.rect.height)
+        sizes = t._cell_sizes(0, None)
+        expected = TextRect(width, 0, text, style=style).get_content_size()
+        assert sizes[0] == pytest.approx(expected)
+
+    c = NullCanvas()
+    t.draw_in_canvas(c)
+    assert c.ops["rect"] >= 2